@@ -0,0 +1,224 @@
+# bench/fixtures.py
+
+"""
+Deterministic stand-ins for the ESPN / PFR documents the pipeline reads.
+
+Shapes follow what the code parses (scoreboard events with linescores, core
+API statistics categories, depth charts in the `positions` shape with
+athlete $refs, athlete statistics, PFR team pages with the games table
+inside an HTML comment). Values are synthetic but stable, so two benchmark
+runs see byte-identical responses.
+"""
+
+import json
+import random
+from datetime import datetime, timedelta
+
+from src.sources.pfr import TEAM_PFR
+from src.team_stats import TEAM_IDS
+
+SEASON = 2025
+SEASON_TYPE = 2
+WEEKS = 18
+FIRST_SUNDAY = datetime(2025, 9, 7, 17, 0)
+# The slate main.run is benchmarked on (week 9 Sunday)
+BENCH_DATE = "2025-11-02"
+
+CORE = "https://sports.core.api.espn.com/v2/sports/football/leagues/nfl"
+TEAMS = list(TEAM_IDS)
+POSITIONS = ["qb", "rb", "wr", "te", "pk", "lt", "lg", "c", "rg", "rt"]
+
+
+def _rng(*key) -> random.Random:
+    return random.Random("/".join(str(k) for k in key))
+
+
+def _schedule():
+    """[(event id, kickoff, home, away)] for a full regular season."""
+    games = []
+    for week in range(WEEKS):
+        order = TEAMS[:1] + TEAMS[1:][week % 31:] + TEAMS[1:][:week % 31]
+        day = FIRST_SUNDAY + timedelta(weeks=week)
+        for i in range(16):
+            home, away = order[i], order[31 - i]
+            if week % 2:
+                home, away = away, home
+            kickoff = day + timedelta(hours=3 * (i % 3))
+            games.append((f"4017{week:02d}{i:02d}", kickoff, home, away))
+    return games
+
+
+SCHEDULE = _schedule()
+
+
+def _competitor(abbr, side, gid):
+    rng = _rng(gid, abbr)
+    periods = [rng.choice([0, 0, 3, 7, 7, 10, 14]) for _ in range(4)]
+    return {
+        "id": str(TEAM_IDS[abbr]),
+        "homeAway": side,
+        "team": {"id": str(TEAM_IDS[abbr]), "abbreviation": abbr,
+                 "displayName": f"Team {abbr}", "logo": f"https://a.espncdn.com/{abbr}.png"},
+        "score": str(sum(periods)),
+        "linescores": [{"value": float(p)} for p in periods],
+        "records": [{"name": "overall", "summary": "5-3"}],
+    }
+
+
+def scoreboard(dates: str | None) -> dict:
+    """Scoreboard for `dates` (YYYYMMDD or YYYYMMDD-YYYYMMDD)."""
+    if dates:
+        lo, _, hi = dates.partition("-")
+        hi = hi or lo
+    else:
+        lo = hi = BENCH_DATE.replace("-", "")
+    events = []
+    for gid, kickoff, home, away in SCHEDULE:
+        if not lo <= kickoff.strftime("%Y%m%d") <= hi:
+            continue
+        comp = {
+            "id": gid,
+            "date": kickoff.strftime("%Y-%m-%dT%H:%MZ"),
+            "competitors": [_competitor(home, "home", gid), _competitor(away, "away", gid)],
+            "venue": {"fullName": f"{home} Stadium"},
+            "broadcasts": [{"names": ["CBS"]}],
+        }
+        events.append({
+            "id": gid,
+            "date": comp["date"],
+            "name": f"{away} at {home}",
+            "season": {"year": SEASON, "type": SEASON_TYPE},
+            "status": {"type": {"completed": True, "state": "post"}},
+            "competitions": [comp],
+        })
+    return {"leagues": [{"abbreviation": "NFL"}], "events": events}
+
+
+def _stat(name, value):
+    return {"name": name, "displayName": name, "value": value, "displayValue": str(value)}
+
+
+def team_statistics(team_id: int) -> dict:
+    rng = _rng("team", team_id)
+    g = 8
+
+    def r(lo, hi):
+        return round(rng.uniform(lo, hi), 1)
+
+    cats = {
+        "general": [("gamesPlayed", g), ("fumblesLost", r(2, 8)), ("fumblesForced", r(3, 10)),
+                    ("fumbleRecoveries", r(2, 6)), ("totalPenalties", r(40, 70))],
+        "passing": [("netPassingYards", r(1400, 2400)), ("passingYards", r(1500, 2500)),
+                    ("completions", r(150, 220)), ("passingAttempts", r(240, 320)),
+                    ("completionPct", r(58, 70)), ("quarterbackRating", r(80, 110)),
+                    ("sacks", r(10, 30)), ("interceptions", r(3, 10))],
+        "rushing": [("rushingYards", r(700, 1300)), ("rushingAttempts", r(180, 260))],
+        "receiving": [("receivingYards", r(1500, 2500))],
+        "defensive": [("sacks", r(10, 30)), ("yardsAllowed", r(2400, 3200)),
+                      ("rushingYardsAllowedPerGame", r(90, 140))],
+        "defensiveInterceptions": [("interceptions", r(3, 12))],
+        "returning": [("kickoffReturnYards", r(200, 500)), ("puntReturnYards", r(50, 150))],
+        "miscellaneous": [("firstDowns", r(150, 200)), ("thirdDownConvPct", r(33, 48)),
+                          ("fourthDownConvPct", r(30, 70)), ("totalGiveaways", r(6, 16)),
+                          ("totalTakeaways", r(6, 16))],
+    }
+    return {
+        "$ref": f"{CORE}/seasons/{SEASON}/types/{SEASON_TYPE}/teams/{team_id}/statistics",
+        "team": {"$ref": f"{CORE}/seasons/{SEASON}/teams/{team_id}"},
+        "splits": {
+            "id": "0",
+            "name": "All Splits",
+            "categories": [
+                {"name": name, "displayName": name.title(),
+                 "stats": [_stat(k, v) for k, v in stats]}
+                for name, stats in cats.items()
+            ],
+        },
+    }
+
+
+def depth_chart_root(team_id: int) -> dict:
+    return {
+        "count": 1,
+        "items": [{"$ref": f"{CORE}/seasons/{SEASON}/teams/{team_id}/depthcharts/1"}],
+    }
+
+
+def depth_chart(team_id: int) -> dict:
+    return {
+        "id": "1",
+        "name": "Base",
+        "positions": {
+            pos: {
+                "position": {"abbreviation": pos.upper(), "name": pos.upper()},
+                "athletes": [
+                    {"slot": slot + 1,
+                     "athlete": {"$ref": f"{CORE}/seasons/{SEASON}/athletes/{team_id}{i:02d}{slot}"}}
+                    for slot in range(3)
+                ],
+            }
+            for i, pos in enumerate(POSITIONS)
+        },
+    }
+
+
+def athlete_statistics(athlete_id: str) -> dict:
+    rng = _rng("athlete", athlete_id)
+    return {
+        "splits": {
+            "categories": [
+                {"name": "passing", "stats": [_stat("passingYards", round(rng.uniform(500, 2800)))]},
+                {"name": "rushing", "stats": [_stat("rushingYards", round(rng.uniform(50, 900)))]},
+                {"name": "receiving", "stats": [_stat("receivingYards", round(rng.uniform(50, 1000)))]},
+                {"name": "kicking", "stats": [_stat("fieldGoalPct", round(rng.uniform(70, 100), 3))]},
+            ]
+        }
+    }
+
+
+def _filler_table(table_id: str, rows: int, cols: int) -> str:
+    head = "".join(f'<th data-stat="c{j}">C{j}</th>' for j in range(cols))
+    body = "".join(
+        "<tr>" + "".join(f'<td data-stat="c{j}">{i * j}</td>' for j in range(cols)) + "</tr>"
+        for i in range(rows)
+    )
+    return f'<table id="{table_id}"><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>'
+
+
+def pfr_team_page(slug: str, season: int) -> str:
+    """A PFR team season page: games table in a comment, plus page-sized filler."""
+    abbr = next((a for a, s in TEAM_PFR.items() if s == slug), None)
+    rows = []
+    for week, (gid, kickoff, home, away) in enumerate(
+        g for g in SCHEDULE if abbr in (g[2], g[3])
+    ):
+        rng = _rng("pfr", gid, abbr)
+        rows.append(
+            "<tr>"
+            f'<th data-stat="week_num">{week + 1}</th>'
+            f'<td data-stat="game_day_of_week">Sun</td>'
+            f'<td data-stat="game_date" csk="{kickoff:%Y-%m-%d}">{kickoff:%B %d}</td>'
+            f'<td data-stat="game_outcome">W</td>'
+            f'<td data-stat="game_location">{"@" if away == abbr else ""}</td>'
+            f'<td data-stat="opp">{home if away == abbr else away}</td>'
+            f'<td data-stat="pts_off">{rng.randint(10, 38)}</td>'
+            f'<td data-stat="pts_def">{rng.randint(10, 38)}</td>'
+            f'<td data-stat="first_down_off">{rng.randint(12, 28)}</td>'
+            f'<td data-stat="yards_off">{rng.randint(220, 480)}</td>'
+            "</tr>"
+        )
+    games = (
+        '<table class="stats_table" id="games"><thead><tr><th data-stat="week_num">Week</th>'
+        '</tr></thead><tbody>' + "".join(rows) + "</tbody></table>"
+    )
+    filler = "".join(_filler_table(f"t{k}", 120, 25) for k in range(6))
+    return (
+        f"<html><head><title>{slug} {season}</title></head><body>"
+        f'<div id="all_other">{filler}</div>'
+        f'<div id="all_games"><!--\n{games}\n--></div>'
+        "</body></html>"
+    )
+
+
+def encode(doc) -> bytes:
+    return json.dumps(doc).encode("utf-8")
@@ -0,0 +1,185 @@
+# bench/run.py
+
+"""
+Offline benchmark: runs the pipeline against bench.server and compares
+wall time, request count and peak memory with a stored baseline.
+
+    python -m bench.run                          # compare with bench/baseline.json
+    python -m bench.run --latency-ms 40 --error-rate 0.02
+    python -m bench.run --scenario team_metrics --repeat 5
+    python -m bench.run --update-baseline
+
+Scenarios (each starts from empty cache/output dirs unless noted):
+- main_cold     main.run() for the fixture slate
+- main_warm     main.run() again on the caches main_cold left behind
+- team_metrics  get_team_metrics() for all 32 teams
+- starters      get_starter_metrics() for all 32 teams
+- pfr           team_game_log_year() for all 32 teams
+
+Runs go through the real http layer; only the hosts are rerouted (via the
+`host_overrides` setting) and PFR's rate limit is lifted so the numbers
+measure our code, not the politeness budget. Wall time is the median of
+--repeat runs; peak memory comes from one extra run under tracemalloc.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import yaml
+
+from src import main as pipeline
+from src import pool
+from src.sources.pfr import team_game_log_year
+from src.starters import get_starter_metrics
+from src.team_stats import TEAM_IDS, get_team_metrics
+from src.utils import SETTINGS_OVERRIDE_ENV, load_settings
+
+from . import fixtures
+from .server import FixtureServer
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+def _workspace(srv: FixtureServer) -> Path:
+    """Fresh dirs + a settings overlay pointing the pipeline at them and srv."""
+    root = Path(tempfile.mkdtemp(prefix="nfl-bench-"))
+    overlay = {
+        "output_dir": str(root / "data"),
+        "archive_dir": str(root / "archive"),
+        "log_dir": str(root / "logs"),
+        "cache_dir": str(root / "cache"),
+        "history_path": str(root / "history.sqlite"),
+        "host_overrides": srv.host_overrides(),
+        "host_rate_limits": {},
+    }
+    path = root / "settings.yaml"
+    path.write_text(yaml.safe_dump(overlay), encoding="utf-8")
+    os.environ[SETTINGS_OVERRIDE_ENV] = str(path)
+    return root
+
+
+def _stage_setup() -> None:
+    pipeline.setup_run(load_settings(), use_cache=False)
+
+
+def _pfr_all() -> None:
+    pool.map_teams(
+        lambda abbr: team_game_log_year(abbr, fixtures.SEASON), list(TEAM_IDS), label="bench"
+    )
+
+
+# name -> (prepare, measured body); prepare runs inside the fresh workspace
+SCENARIOS = {
+    "main_cold": (None, lambda: pipeline.run(fixtures.BENCH_DATE)),
+    "main_warm": (lambda: pipeline.run(fixtures.BENCH_DATE),
+                  lambda: pipeline.run(fixtures.BENCH_DATE)),
+    "team_metrics": (_stage_setup, lambda: get_team_metrics(None, fixtures.SEASON)),
+    "starters": (_stage_setup, lambda: get_starter_metrics(None, fixtures.BENCH_DATE)),
+    "pfr": (_stage_setup, _pfr_all),
+}
+
+
+def _once(srv: FixtureServer, name: str, trace: bool = False) -> dict:
+    prepare, body = SCENARIOS[name]
+    _workspace(srv)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if prepare:
+            prepare()
+        before = srv.requests()
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        body()
+        wall = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace else None
+        if trace:
+            tracemalloc.stop()
+    return {"wall_s": wall, "requests": srv.requests() - before, "peak_mib": peak and peak / 2**20}
+
+
+def measure(srv: FixtureServer, name: str, repeat: int) -> dict:
+    runs = [_once(srv, name) for _ in range(repeat)]
+    mem = _once(srv, name, trace=True)
+    return {
+        "wall_s": round(statistics.median(r["wall_s"] for r in runs), 4),
+        "requests": runs[-1]["requests"],
+        "peak_mib": round(mem["peak_mib"], 2),
+    }
+
+
+def _delta(now: float, base: float | None) -> str:
+    if not base:
+        return "    n/a"
+    return f"{(now - base) / base:+7.1%}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline NFL pilot benchmark")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store these results as the new baseline")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="Exit 1 if any wall time is this fraction slower than baseline")
+    args = parser.parse_args()
+
+    conditions = {
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "repeat": args.repeat,
+    }
+    srv = FixtureServer(0, args.latency_ms, args.jitter_ms, args.error_rate).start()
+
+    try:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        baseline = {}
+    if baseline and baseline.get("conditions") != conditions:
+        print(f"[bench] note: baseline was recorded with {baseline.get('conditions')}")
+    base = baseline.get("scenarios", {})
+
+    results = {}
+    regressed = False
+    print(f"{'scenario':<14}{'wall s':>9}{'vs base':>9}{'requests':>10}{'peak MiB':>10}{'vs base':>9}")
+    for name in args.scenario or list(SCENARIOS):
+        r = measure(srv, name, args.repeat)
+        results[name] = r
+        b = base.get(name, {})
+        print(
+            f"{name:<14}{r['wall_s']:>9.3f}{_delta(r['wall_s'], b.get('wall_s')):>9}"
+            f"{r['requests']:>6} ({b.get('requests', '-'):>3})"
+            f"{r['peak_mib']:>10.1f}{_delta(r['peak_mib'], b.get('peak_mib')):>9}"
+        )
+        if (args.max_regression is not None and b.get("wall_s")
+                and r["wall_s"] > b["wall_s"] * (1 + args.max_regression)):
+            regressed = True
+    srv.shutdown()
+
+    if args.update_baseline:
+        Path(args.baseline).write_text(
+            json.dumps({"conditions": conditions, "scenarios": results}, indent=2, sort_keys=True)
+            + "\n",
+            encoding="utf-8",
+        )
+        print(f"[bench] baseline written → {args.baseline}")
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# bench/server.py
+
+"""
+Local stand-in for ESPN and PFR, serving bench.fixtures.
+
+    python -m bench.server --port 8765 --latency-ms 40 --error-rate 0.02
+
+Every host the pipeline talks to is pointed here through `host_overrides`
+(see HOSTS); routing is by path only. Each request sleeps latency_ms (plus up
+to jitter_ms) and fails with probability error_rate: 503 + Retry-After: 0 for
+PFR pages (which fetch() retries), 500 for JSON (which callers leave blank).
+"""
+
+import argparse
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import fixtures
+
+# Real hosts the benchmark reroutes to this server
+HOSTS = [
+    "site.api.espn.com",
+    "sports.core.api.espn.com",
+    "www.pro-football-reference.com",
+]
+
+_ROUTES = [
+    (re.compile(r"/apis/site/v2/sports/football/nfl/scoreboard$"), "scoreboard"),
+    (re.compile(r"/teams/(\d+)/statistics$"), "team_statistics"),
+    (re.compile(r"/teams/(\d+)/depthcharts$"), "depth_chart_root"),
+    (re.compile(r"/teams/(\d+)/depthcharts/\d+$"), "depth_chart"),
+    (re.compile(r"/athletes/(\d+)/statistics/\d+/type/\d+$"), "athlete_statistics"),
+    (re.compile(r"^/teams/([a-z]{3})/(\d{4})\.htm$"), "pfr_team_page"),
+]
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0, seed: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts: Counter = Counter()
+        self.bytes_sent = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def host_overrides(self) -> dict:
+        return {host: self.base_url for host in HOSTS}
+
+    def requests(self) -> int:
+        with self.lock:
+            return sum(self.counts.values())
+
+    def start(self) -> "FixtureServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY a
+    # kept-alive connection stalls on delayed ACKs between them
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, ctype: str, headers: dict | None = None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.bytes_sent += len(body)
+
+    def do_GET(self):
+        srv = self.server
+        parts = urlsplit(self.path)
+        with srv.lock:
+            fail = srv.rng.random() < srv.error_rate
+            delay = (srv.latency_ms + srv.rng.uniform(0, srv.jitter_ms)) / 1000
+
+        route, args = None, ()
+        for pattern, name in _ROUTES:
+            m = pattern.search(parts.path)
+            if m:
+                route, args = name, m.groups()
+                break
+        with srv.lock:
+            srv.counts[route or "unknown"] += 1
+
+        if delay:
+            time.sleep(delay)
+        if route is None:
+            return self._send(404, b"not found", "text/plain")
+        if fail:
+            if route == "pfr_team_page":
+                return self._send(503, b"busy", "text/plain", {"Retry-After": "0"})
+            return self._send(500, b"injected error", "text/plain")
+
+        if route == "scoreboard":
+            dates = (parse_qs(parts.query).get("dates") or [None])[0]
+            return self._send(200, fixtures.encode(fixtures.scoreboard(dates)), "application/json")
+        if route == "pfr_team_page":
+            page = fixtures.pfr_team_page(args[0], int(args[1]))
+            return self._send(200, page.encode("utf-8"), "text/html; charset=utf-8")
+
+        builder = getattr(fixtures, route)
+        arg = int(args[0]) if route != "athlete_statistics" else args[0]
+        return self._send(200, fixtures.encode(builder(arg)), "application/json")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local ESPN/PFR stand-in for benchmarks")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    srv = FixtureServer(args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"[bench] serving fixtures on {srv.base_url} (Ctrl-C to stop)")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
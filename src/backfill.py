@@ -0,0 +1,133 @@
+# src/backfill.py
+
+"""
+Date-range backfill: rebuild output rows for many dates in one run.
+
+    python -m src.main --start 2024-09-05 --end 2024-12-31
+    python -m src.main --season 2024
+
+- Dates are planned up front from the schedule index (one bulk scoreboard
+  request per season it doesn't hold yet); days without games are dropped.
+- Season-level documents (ESPN team stats) are fetched once per season for
+  every team that plays in the range and shared by all its dates.
+- Ledger columns (quarter scoring, home/road PPG) are built per date from
+  the games strictly before it, so no row sees its own or later results.
+- Per-date frames are built concurrently through pool.imap and streamed, in
+  date order, into data/backfill_<start>_<end>.csv and the history store.
+
+latest.csv and the daily archive are left alone.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List
+
+from . import history, linescores
+from .main import build_frame, finish_run, setup_run
+from .output import write_csv_stream
+from .pool import imap
+from .schedule import SCHEDULE, _matchups_from_events, _season_of, season_range
+from .team_stats import _season_and_type, get_team_metrics, select_teams
+from .utils import load_settings, schema_columns
+
+
+def plan(start: str, end: str) -> Dict[str, List[tuple]]:
+    """
+    {date: matchups} for every date in [start, end] with at least one game,
+    from the schedule index (one bulk scoreboard request per season not yet
+    indexed). Finished games in the range also go into the linescore store.
+    """
+    for season in range(_season_of(start), _season_of(end) + 1):
+        first, last = season_range(season)
+        SCHEDULE.ensure(min(max(start, first), last))
+
+    slates = {}
+    for day, events in SCHEDULE.by_date(start, end).items():
+        linescores.update(events)
+        matchups = _matchups_from_events(events)
+        if matchups:
+            slates[day] = matchups
+    return slates
+
+
+def _season_tables(season: int, teams, last_day: str) -> list:
+    """Season-level tables for one season, fetched once for all its dates."""
+    print(f"[backfill] season {season}: fetching {len(teams) if teams else 32} teams")
+    linescores.refresh(season, last_day)
+    return [get_team_metrics(teams, season)]
+
+
+def _ledger_tables(day: str, season: int, matchups: List[tuple]) -> list:
+    """Home/road PPG and quarter scoring for day's teams, as of day."""
+    teams = select_teams({team for (_, team, _, _) in matchups})
+    return [
+        linescores.get_home_road_ppg(teams, season, day),
+        linescores.get_quarter_scoring(teams, season, day),
+    ]
+
+
+def run_backfill(
+    start: str | None = None,
+    end: str | None = None,
+    season: int | None = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+) -> int:
+    """
+    Build and write rows for every game date in the range. `season` fills in
+    whichever of start/end is missing. Returns the number of rows written.
+    """
+    settings = load_settings()
+
+    if season is not None:
+        first, last = season_range(season)
+        start, end = start or first, end or last
+    if not start or not end:
+        print("[backfill] need --season or both --start and --end")
+        return 0
+
+    setup_run(settings, use_cache, refresh)
+    schema = schema_columns()
+
+    slates = plan(start, end)
+    if not slates:
+        print(f"[backfill] no NFL games between {start} and {end}")
+        return 0
+    print(f"[backfill] {len(slates)} game dates between {start} and {end}")
+
+    # Group dates by season so each season's documents are fetched once
+    by_season: Dict[int, List[str]] = {}
+    for day in slates:
+        by_season.setdefault(_season_and_type(day)[0], []).append(day)
+
+    league_wide = not settings.get("only_teams_playing_today", True)
+    tables = {}
+    for yr, days in by_season.items():
+        teams = None if league_wide else {
+            team for day in days for (_, team, _, _) in slates[day]
+        }
+        tables[yr] = _season_tables(yr, teams, days[-1])
+
+    season_of = {day: yr for yr, days in by_season.items() for day in days}
+
+    def build(day: str):
+        yr = season_of[day]
+        return build_frame(
+            day, slates[day], schema, *tables[yr], *_ledger_tables(day, yr, slates[day])
+        )
+
+    history_path = settings.get("history_path")
+
+    def frames():
+        for day, frame in imap(build, slates, label="backfill"):
+            if history_path:
+                history.append(frame, history_path)
+            yield frame
+
+    path = f'{settings["output_dir"]}/backfill_{start}_{end}.csv'
+    rows = write_csv_stream(frames(), path)
+    linescores.LINESCORES.save()
+    print(f"✅ backfill wrote {rows} rows for {len(slates)} dates → {path}")
+    finish_run(settings, mode="backfill", start=start, end=end, dates=len(slates),
+               rows=rows, written=[path])
+    return rows
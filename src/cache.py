@@ -0,0 +1,226 @@
+# src/cache.py
+
+"""
+Response caches.
+
+RUN_CACHE  - run-scoped, in-memory response store.
+DISK_CACHE - persistent HTTP cache shared between runs (see DiskCache).
+
+Every document we pull during a run goes through RUN_CACHE, keyed by URL
+(or a small tuple when we memoise a parsed form of that URL). The first
+caller for a key does the work; anyone asking for the same key while that
+load is in flight waits for it instead of issuing a second request.
+
+main.run() clears the store at the start of each run so nothing leaks
+between runs in the same process.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable
+
+from .utils import atomic_write
+
+
+class _Pending:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class RunCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[Hashable, Any] = {}
+        self._inflight: Dict[Hashable, _Pending] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, calling loader() at most once.
+
+        Errors raised by loader are passed to every waiting caller but are
+        not cached, so a later call may try again.
+        """
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                return self._values[key]
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = _Pending()
+                self._inflight[key] = pending
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            value = loader()
+        except BaseException as e:
+            pending.error = e
+            raise
+        else:
+            pending.value = value
+            with self._lock:
+                self._values[key] = value
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.event.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+RUN_CACHE = RunCache()
+
+
+# Seconds a stored response counts as fresh, per resource class.
+# Overridable via `cache_ttl_seconds` in settings.yaml.
+DEFAULT_TTLS: Dict[str, int] = {
+    "schedule": 10 * 60,
+    "team_stats": 6 * 3600,
+    "athlete": 6 * 3600,
+    "depth_chart": 24 * 3600,
+    "default": 3600,
+}
+
+
+class DiskCache:
+    """
+    Persistent HTTP cache under `cache_dir` (data/cache by default).
+
+    Each URL is stored as <sha1>.json (metadata: url, resource class,
+    stored_at, ETag, Last-Modified, encoding) plus <sha1>.body (raw bytes).
+
+    - Fresh entries (younger than the resource's TTL) are served without a
+      request.
+    - Stale entries are revalidated with If-None-Match / If-Modified-Since;
+      a 304 refreshes stored_at and serves the stored body.
+    - `refresh` treats every entry as stale (revalidate everything);
+      callers can also pass `stale_before` to revalidate entries stored
+      before a known change (e.g. a game going final);
+      `enabled=False` bypasses the cache completely.
+
+    The cache is disabled until configure() is called with a directory.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.root: Path | None = None
+        self.ttls: Dict[str, int] = dict(DEFAULT_TTLS)
+        self.enabled = False
+        self.refresh = False
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def configure(self, root: str | None, ttls: Dict[str, int] | None = None,
+                  enabled: bool = True, refresh: bool = False) -> None:
+        self.root = Path(root) if root else None
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.enabled = bool(enabled and root)
+        self.refresh = refresh
+        self.hits = self.revalidated = self.misses = 0
+        if self.enabled:
+            self.root.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, key: str):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        folder = self.root / digest[:2]
+        return folder / f"{digest}.json", folder / f"{digest}.body"
+
+    def lookup(self, key: str) -> Dict[str, Any] | None:
+        """Stored entry for key (metadata + 'body' bytes), or None."""
+        if not self.enabled:
+            return None
+        meta_path, body_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            meta["body"] = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def is_fresh(self, entry: Dict[str, Any], stale_before: float | None = None) -> bool:
+        """Young enough to serve; entries stored before stale_before never are."""
+        if self.refresh:
+            return False
+        if stale_before is not None and entry.get("stored_at", 0) < stale_before:
+            return False
+        ttl = self.ttls.get(entry.get("resource"), self.ttls["default"])
+        return time.time() - entry.get("stored_at", 0) < ttl
+
+    def stored_at(self, key: str) -> float | None:
+        """When key's body was last stored or revalidated (None if not stored)."""
+        if not self.enabled:
+            return None
+        meta_path, _ = self._paths(key)
+        try:
+            return json.loads(meta_path.read_text(encoding="utf-8")).get("stored_at")
+        except (OSError, ValueError):
+            return None
+
+    def validators(self, entry: Dict[str, Any] | None) -> Dict[str, str]:
+        """Conditional request headers for a stored entry."""
+        headers: Dict[str, str] = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, key: str, resource: str, body: bytes, etag: str | None = None,
+              last_modified: str | None = None, encoding: str | None = None) -> None:
+        if not self.enabled:
+            return
+        meta_path, body_path = self._paths(key)
+        meta = {
+            "url": key,
+            "resource": resource,
+            "stored_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": encoding,
+        }
+        atomic_write(body_path, body)
+        atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def touch(self, key: str, entry: Dict[str, Any]) -> None:
+        """Mark a revalidated (304) entry as fresh again."""
+        if not self.enabled:
+            return
+        meta = {k: v for k, v in entry.items() if k != "body"}
+        meta["stored_at"] = time.time()
+        meta_path, _ = self._paths(key)
+        atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def summary(self) -> str:
+        return (
+            f"{self.hits} fresh, {self.revalidated} revalidated (304), "
+            f"{self.misses} downloaded"
+        )
+
+
+DISK_CACHE = DiskCache()
@@ -4,100 +4,121 @@
 Compute derived metrics that need season splits / game logs.
 
 Right now:
+- NFL 33: Road points per game
 - NFL 34: Home points per game
-- NFL 35: Road points per game
-- NFL 36: League-wide baseline QB rating (constant for now)
 
-We reuse ESPN's statistics endpoint via team_stats._fetch_team_stats.
-If a key is missing for a team, we simply skip it.
+Both come from the local results ledger (linescores.LINESCORES), which is
+filled from scoreboard events we already download, so no extra requests.
+If a team has no finished home (or road) games yet, that column stays blank.
+
+get_pfr_fallbacks() fills NFL 33/34 from the team's PFR season page when
+the ledger has nothing for a team that has played. Only those teams are
+looked up, so on a normal day it makes no PFR requests at all.
 """
 
-from .team_stats import _fetch_team_stats, TEAM_IDS
+from datetime import date
+
+import pandas as pd
 
+from .linescores import get_home_road_ppg as _ledger_home_road
+from .runstats import timed
+from .pool import map_teams
+from .schedule import SCHEDULE, _is_final, _matchups_from_events, season_range
+from .sources.pfr import team_game_log_year
+from .team_stats import _season_and_type, select_teams
 
-def _first_existing(raw: dict, keys: list[str]):
-    """Return first raw[k] that exists and is numeric-like."""
-    for k in keys:
-        v = raw.get(k)
-        if v is not None:
-            try:
-                return float(v)
-            except (TypeError, ValueError):
-                continue
-    return None
+# output column -> PFR games-table side ("H"/"A") averaged over pts_off.
+# The season page's games table has scores but no per-game attempt or
+# completion counts, so PFR can't stand in for NFL 26-30.
+PFR_COLUMNS = {
+    "NFL 33": "A",
+    "NFL 34": "H",
+}
 
 
-def get_home_road_ppg() -> dict:
+@timed("derived")
+def get_home_road_ppg(teams=None, season: int | None = None, as_of: str | None = None) -> dict:
     """
     Returns:
         {
-          "DAL": {"NFL 34": home_ppg, "NFL 35": road_ppg, "NFL 36": 90.0},
+          "DAL": {"NFL 33": road_ppg, "NFL 34": home_ppg},
           ...
         }
 
     Safe:
-    - If we can't find the needed fields for a team, we just don't add that team.
+    - Teams without finished games in the ledger are left out.
     - main.py will leave those NFL columns blank for that team.
+
+    `teams` limits the work to those abbreviations; None means all 32.
+    `season` defaults to the current one. Only games before `as_of`
+    (YYYY-MM-DD, default today) count, so a date's own games never feed its
+    row. Call linescores.refresh() first so the ledger has the latest finals.
     """
-    results: dict[str, dict] = {}
+    if season is None:
+        season, _ = _season_and_type()
+    results = _ledger_home_road(select_teams(teams), season, as_of)
 
-    for abbr in TEAM_IDS.keys():
-        raw = _fetch_team_stats(abbr)
-        if not raw:
-            continue
+    print(f"[derived] computed home/road PPG for {len(results)} teams")
+    return results
 
-        # These keys are based on ESPN stats JSON naming patterns.
-        # We try multiple variants to be robust.
-        home_pts = _first_existing(
-            raw,
-            [
-                "homePointsFor",
-                "pointsForHome",
-                "homePointsScored",
-                "pointsScoredHome",
-            ],
-        )
-        home_g = _first_existing(
-            raw,
-            [
-                "homeGamesPlayed",
-                "homeGames",
-                "gamesPlayedHome",
-            ],
-        )
-
-        road_pts = _first_existing(
-            raw,
-            [
-                "roadPointsFor",
-                "pointsForAway",
-                "roadPointsScored",
-                "pointsScoredAway",
-            ],
-        )
-        road_g = _first_existing(
-            raw,
-            [
-                "roadGamesPlayed",
-                "roadGames",
-                "gamesPlayedAway",
-            ],
-        )
-
-        row: dict = {}
-
-        if home_pts is not None and home_g and home_g > 0:
-            row["NFL 34"] = round(home_pts / home_g, 2)
-
-        if road_pts is not None and road_g and road_g > 0:
-            row["NFL 35"] = round(road_pts / road_g, 2)
-
-        # Baseline league QB rating constant for now
-        # (John: "quarterback rating, per league")
-        row["NFL 36"] = 90.0
-
-        if row:
-            results[abbr] = row
 
-    print(f"[derived] computed home/road PPG for {len(results)} teams")
+def _played_before(season: int, as_of: str) -> set:
+    """Teams with a final of `season` before as_of in the schedule index."""
+    first, _ = season_range(season)
+    teams = set()
+    for day, events in SCHEDULE.by_date(first, as_of).items():
+        if day >= as_of:
+            continue
+        for ev in events:
+            if _is_final(ev):
+                teams.update(team for (_, team, _, _) in _matchups_from_events([ev]))
+    return teams
+
+
+def _pfr_home_road(abbr: str, season: int, as_of: str) -> dict:
+    """NFL 33/34 from the team's PFR season page, games before as_of only."""
+    df, _ = team_game_log_year(abbr, season)
+    if df.empty or "pts_off" not in df.columns:
+        return {}
+    played = df[(df["game_date"] < pd.Timestamp(as_of)) & df["pts_off"].notna()]
+    row = {}
+    for col, side in PFR_COLUMNS.items():
+        pts = played.loc[played["H/A"] == side, "pts_off"]
+        if len(pts):
+            row[col] = round(float(pts.mean()), 2)
+    return row
+
+
+@timed("derived")
+def get_pfr_fallbacks(tables: list, teams=None, season: int | None = None,
+                      as_of: str | None = None) -> dict:
+    """
+    Returns {"DAL": {"NFL 33": ..., "NFL 34": ...}, ...} from PFR for teams
+    that have finals before as_of (YYYY-MM-DD, default today) yet no
+    home/road value in `tables` ({team: {column: value}} dicts; None
+    entries are skipped) -- i.e. the ledger missed their games.
+
+    Teams that simply haven't played yet, or have one side filled, are
+    skipped without a request; the rest are fetched concurrently through
+    pool.map_teams (PFR's token bucket paces them). Like the ledger, only
+    games before as_of count. A team whose page fails is left out.
+    """
+    if season is None:
+        season, _ = _season_and_type()
+    as_of = as_of or str(date.today())
+    played = _played_before(season, as_of)
+    gaps = []
+    for abbr in select_teams(teams):
+        row = {}
+        for table in tables:
+            row.update((table or {}).get(abbr) or {})
+        if abbr in played and all(row.get(col) in (None, "") for col in PFR_COLUMNS):
+            gaps.append(abbr)
+    if not gaps:
+        return {}
+
+    filled = map_teams(lambda abbr: _pfr_home_road(abbr, season, as_of), gaps, label="derived")
+    results = {abbr: row for abbr, row in filled.items() if row}
+
+    print(f"[derived] PFR filled gaps for {len(results)} of {len(gaps)} teams")
     return results
@@ -0,0 +1,77 @@
+# src/extract.py
+
+"""
+Targeted stat extraction for ESPN statistics documents.
+
+ESPN nests numeric stats as {"name": ..., "value": ...} inside categories
+(splits.categories[] -> {"name": "passing", "stats": [...]}). Instead of
+flattening the whole document, StatExtractor is built once with the stat
+names a caller needs and pulls just those:
+
+- "netPassingYards"              first match anywhere in the document
+- "defensive.sacks"              only the "sacks" inside the "defensive" category
+- ("QBRating", "quarterbackRating")
+                                 alternative names for one stat
+
+Results are keyed by the wanted spelling, so stats that share a name across
+categories no longer overwrite each other. An unqualified name takes its
+first match in document order (a flattened dict kept the last one), so a
+name that means different things in different categories should be pinned
+with its category.
+
+The walk is iterative, in document order, and stops once every wanted
+entry has been found; a tuple counts as found as soon as any of its names
+is. Names met before the walk stops are all returned, so callers still
+pick between alternatives themselves.
+"""
+
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+
+class StatExtractor:
+    def __init__(self, wanted: Iterable[str | Sequence[str]]):
+        groups = [(w,) if isinstance(w, str) else tuple(w) for w in wanted]
+        self.groups = list(dict.fromkeys(groups))
+        self.wanted = list(dict.fromkeys(key for group in self.groups for key in group))
+        # stat name -> [(output key, required category or None, group index)]
+        self._by_name: Dict[str, List[Tuple[str, str | None, int]]] = {}
+        for i, group in enumerate(self.groups):
+            for key in group:
+                category, _, name = key.rpartition(".")
+                self._by_name.setdefault(name, []).append((key, category or None, i))
+
+    def extract(self, doc: Any) -> Dict[str, float]:
+        out: Dict[str, float] = {}
+        found = [False] * len(self.groups)
+        remaining = len(self.groups)
+        by_name = self._by_name
+
+        stack: List[Tuple[Any, str | None]] = [(doc, None)]
+        while stack and remaining:
+            obj, category = stack.pop()
+
+            if isinstance(obj, dict):
+                name = obj.get("name")
+                val = obj.get("value")
+                if name and isinstance(val, (int, float)) and name in by_name:
+                    for key, cat, i in by_name[name]:
+                        if key not in out and (cat is None or cat == category):
+                            out[key] = val
+                            if not found[i]:
+                                found[i] = True
+                                remaining -= 1
+
+                # A {"name": ..., "stats": [...]} dict opens a category
+                if name and isinstance(obj.get("stats"), list):
+                    category = name
+
+                children = [v for v in obj.values() if isinstance(v, (dict, list))]
+            elif isinstance(obj, list):
+                children = [v for v in obj if isinstance(v, (dict, list))]
+            else:
+                continue
+
+            # Reversed so the stack pops children in document order
+            stack.extend((child, category) for child in reversed(children))
+
+        return out
@@ -0,0 +1,207 @@
+# src/history.py
+
+"""
+Local history store for every output row we have produced.
+
+Rows live in one SQLite table (`features`, at history_path in settings.yaml,
+data/history.sqlite by default) keyed by (game_date, game_id, team), with
+indexes on (game_date, team) and game_id, so questions like "NFL 9 for KC
+over the season" read only the matching rows and columns instead of every
+daily archive CSV.
+
+- append(frame)          called by main.run after each write
+- import_archives(dirs)  one-off ingest of the existing archive/*.csv files
+- query(...)             small read API returning a DataFrame
+
+CLI:
+    python -m src.history import [DIR ...]     (default: both archive dirs)
+    python -m src.history query --team KC --column "NFL 9"
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+from pathlib import Path
+from typing import Iterable, List
+
+import pandas as pd
+
+from .runstats import timed
+from .output import KEY_COLUMNS
+from .utils import load_settings
+
+TABLE = "features"
+DEFAULT_PATH = "data/history.sqlite"
+DEFAULT_ARCHIVE_DIRS = ["archive", "data/archive"]
+
+
+def _q(name: str) -> str:
+    """Quote a column name ("NFL 9" has a space)."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _path(path: str | None) -> str:
+    if path:
+        return path
+    return load_settings().get("history_path") or DEFAULT_PATH
+
+
+def connect(path: str | None = None) -> sqlite3.Connection:
+    """Open (and if needed create) the history database."""
+    path = _path(path)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path)
+    keys = ", ".join(f"{_q(c)} TEXT NOT NULL" for c in KEY_COLUMNS)
+    con.executescript(
+        f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            {keys},
+            PRIMARY KEY (game_date, game_id, team)
+        );
+        CREATE INDEX IF NOT EXISTS idx_{TABLE}_date_team ON {TABLE} (game_date, team);
+        CREATE INDEX IF NOT EXISTS idx_{TABLE}_game ON {TABLE} (game_id);
+        """
+    )
+    return con
+
+
+def _columns(con: sqlite3.Connection) -> List[str]:
+    return [row[1] for row in con.execute(f"PRAGMA table_info({TABLE})")]
+
+
+@timed("history")
+def append(frame: pd.DataFrame, path: str | None = None) -> int:
+    """
+    Upsert output rows into the store. New metric columns are added as
+    REAL; blanks are stored as NULL. Returns the number of rows written.
+    """
+    if frame.empty:
+        return 0
+
+    frame = frame.mask(frame == "")
+    metrics = [c for c in frame.columns if c not in KEY_COLUMNS]
+    for col in metrics:
+        frame[col] = pd.to_numeric(frame[col], errors="coerce")
+    for col in KEY_COLUMNS:
+        frame[col] = frame[col].astype(str)
+
+    con = connect(path)
+    try:
+        have = set(_columns(con))
+        for col in metrics:
+            if col not in have:
+                con.execute(f"ALTER TABLE {TABLE} ADD COLUMN {_q(col)} REAL")
+
+        cols = KEY_COLUMNS + metrics
+        sql = (
+            f"INSERT OR REPLACE INTO {TABLE} ({', '.join(_q(c) for c in cols)}) "
+            f"VALUES ({', '.join('?' for _ in cols)})"
+        )
+        records = frame[cols].astype(object).where(frame[cols].notna(), None)
+        with con:
+            con.executemany(sql, records.itertuples(index=False, name=None))
+    finally:
+        con.close()
+    return len(frame)
+
+
+def import_archives(dirs: Iterable[str] | None = None, path: str | None = None) -> int:
+    """
+    Ingest existing daily archive CSVs. Files are loaded oldest first, so a
+    later snapshot of the same (game_date, game_id, team) wins.
+    """
+    dirs = list(dirs or DEFAULT_ARCHIVE_DIRS)
+    files = sorted(
+        (f for d in dirs for f in Path(d).glob("*.csv")),
+        key=lambda f: f.name,
+    )
+
+    total = 0
+    for f in files:
+        frame = pd.read_csv(f, dtype=str, keep_default_na=False)
+        if not set(KEY_COLUMNS).issubset(frame.columns):
+            print(f"[history] skipping {f}: missing key columns")
+            continue
+        total += append(frame, path)
+    print(f"[history] imported {total} rows from {len(files)} files")
+    return total
+
+
+def query(
+    teams: Iterable[str] | None = None,
+    dates: Iterable[str] | None = None,
+    columns: Iterable[str] | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    path: str | None = None,
+) -> pd.DataFrame:
+    """
+    Read rows from the store.
+
+    - teams:   team abbreviations (None = all)
+    - dates:   exact game dates, YYYY-MM-DD (None = all)
+    - start/end: inclusive game_date range
+    - columns: metric columns to return besides the key columns (None = all)
+    """
+    con = connect(path)
+    try:
+        have = _columns(con)
+        wanted = [c for c in (columns or have) if c in have and c not in KEY_COLUMNS]
+        select = ", ".join(_q(c) for c in KEY_COLUMNS + wanted)
+
+        where, params = [], []
+        if teams is not None:
+            teams = list(teams)
+            where.append(f"team IN ({', '.join('?' for _ in teams)})")
+            params += teams
+        if dates is not None:
+            dates = list(dates)
+            where.append(f"game_date IN ({', '.join('?' for _ in dates)})")
+            params += dates
+        if start:
+            where.append("game_date >= ?")
+            params.append(start)
+        if end:
+            where.append("game_date <= ?")
+            params.append(end)
+
+        sql = f"SELECT {select} FROM {TABLE}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY game_date, game_id, team"
+        return pd.read_sql_query(sql, con, params=params)
+    finally:
+        con.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="NFL pilot history store")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    imp = sub.add_parser("import", help="Ingest archive CSV directories")
+    imp.add_argument("dirs", nargs="*", help="Archive directories (default: archive, data/archive)")
+
+    q = sub.add_parser("query", help="Print rows from the store")
+    q.add_argument("--team", action="append", help="Team abbreviation (repeatable)")
+    q.add_argument("--date", action="append", help="Game date YYYY-MM-DD (repeatable)")
+    q.add_argument("--start", help="First game date (inclusive)")
+    q.add_argument("--end", help="Last game date (inclusive)")
+    q.add_argument("--column", action="append", help="Metric column (repeatable)")
+
+    args = parser.parse_args()
+    if args.cmd == "import":
+        import_archives(args.dirs or None)
+    else:
+        frame = query(
+            teams=args.team,
+            dates=args.date,
+            columns=args.column,
+            start=args.start,
+            end=args.end,
+        )
+        print(frame.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
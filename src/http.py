@@ -1,35 +1,301 @@
 # src/http.py
-import time, random, requests
-
-SESSION = requests.Session()
-SESSION.headers.update({
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/123.0.0.0 Safari/537.36"
-    ),
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-    "Accept-Language": "en-US,en;q=0.9",
-    "Accept-Encoding": "gzip, deflate, br",
-    "Connection": "keep-alive",
-    "Upgrade-Insecure-Requests": "1",
-    # IMPORTANT: referer to the same domain
-    "Referer": "https://www.pro-football-reference.com/",
-})
+import time, random, threading, requests
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .cache import DISK_CACHE, RUN_CACHE
+from .runstats import RUN_STATS
+from .pool import host_bucket, host_slot, max_in_flight
+from .replay import ARCHIVE
+
+# Statuses that mean "slow down": the host's bucket is paused for Retry-After
+THROTTLE_STATUSES = (429, 503)
+# Jittered exponential backoff between failed attempts (seconds)
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+# host -> base URL ("http://127.0.0.1:8765") that requests for that host are
+# sent to instead; cache keys, rate limits and stats keep the real host.
+# Set from `host_overrides` in settings.yaml (the offline benchmark uses it).
+_HOST_OVERRIDES: dict = {}
+
+
+def set_host_overrides(overrides: dict | None) -> None:
+    _HOST_OVERRIDES.clear()
+    _HOST_OVERRIDES.update({h.lower(): base for h, base in (overrides or {}).items()})
+
+
+def _route(url: str) -> str:
+    """Where a request for url actually goes (see _HOST_OVERRIDES)."""
+    if not _HOST_OVERRIDES:
+        return url
+    parts = urlsplit(url)
+    base = _HOST_OVERRIDES.get(parts.netloc.lower())
+    if not base:
+        return url
+    target = urlsplit(base)
+    return urlunsplit((target.scheme, target.netloc, parts.path, parts.query, parts.fragment))
+
+
+# Browser-like header profiles; every request to a host carries its profile
+# (callers only add per-request extras such as cache validators).
+_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/123.0.0.0 Safari/537.36"
+)
+HEADER_PROFILES = {
+    "json": {
+        "User-Agent": _USER_AGENT,
+        "Accept": "application/json, text/plain, */*",
+        "Accept-Language": "en-US,en;q=0.9",
+    },
+    "html": {
+        "User-Agent": _USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Upgrade-Insecure-Requests": "1",
+    },
+    "pfr": {
+        "User-Agent": _USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Upgrade-Insecure-Requests": "1",
+        # IMPORTANT: referer to the same domain
+        "Referer": "https://www.pro-football-reference.com/",
+    },
+}
+# host -> header profile; unlisted hosts get "json"
+HOST_PROFILES = {
+    "site.api.espn.com": "json",
+    "sports.core.api.espn.com": "json",
+    "www.espn.com": "html",
+    "www.pro-football-reference.com": "pfr",
+}
+# (connect, read) seconds; a caller's timeout= overrides
+DEFAULT_TIMEOUT = (5, 15)
+PROFILE_TIMEOUTS = {"pfr": (5, 20)}
+# Transport-level retries only (refused/reset connections, read timeouts).
+# HTTP statuses are left to fetch()/get_json so 429/503 still pause the host's
+# bucket and every attempt shows up in RUN_STATS.
+TRANSPORT_RETRY = Retry(
+    total=2,
+    connect=2,
+    read=1,
+    status=0,
+    backoff_factor=0.5,
+    allowed_methods=frozenset({"GET", "HEAD"}),
+    respect_retry_after_header=False,
+    raise_on_status=False,
+)
+
+_sessions: dict = {}
+_sessions_lock = threading.Lock()
+
+
+def _profile(host: str) -> str:
+    return HOST_PROFILES.get(host, "json")
+
+
+def session_for(url: str) -> requests.Session:
+    """
+    The keep-alive Session for url's host, created on first use: the host's
+    header profile, requests' Accept-Encoding (only codings urllib3 can
+    decode), transport retries and a connection pool as large as the host's in-flight limit, so every
+    concurrent request reuses a warm connection instead of a new TLS
+    handshake.
+    """
+    host = urlsplit(url).netloc.lower()
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(HEADER_PROFILES[_profile(host)])
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=max_in_flight(),
+                max_retries=TRANSPORT_RETRY,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def close_sessions() -> None:
+    """Drop every host session (rebuilt on next use with current pool limits)."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
 
 def fetch(url: str, max_retries: int = 5) -> requests.Response:
+    """
+    GET an HTML page (PFR, ESPN), retrying failures. Not cached here: PFR
+    pages are kept in their own page store (sources.pfr.PFR_PAGES).
+
+    Requests are paced by the host's token bucket (see pool.host_bucket), so
+    healthy requests go out at the configured rate with no fixed sleep.
+    Failures back off exponentially with full jitter; a 429/503 pauses the
+    whole host for its Retry-After.
+    """
+    bucket = host_bucket(url)
     last_err = None
     for attempt in range(1, max_retries + 1):
         try:
-            # polite jitter + gradual backoff
-            time.sleep(random.uniform(1.2, 2.4) + (attempt - 1) * 0.6)
-            resp = SESSION.get(url, timeout=20, allow_redirects=True)
+            resp = _send(bucket, url)
             # Some anti-bot setups 302 to a challenge; follow and re-try once
             if resp.status_code in (301, 302, 303, 307, 308):
-                time.sleep(random.uniform(0.8, 1.6))
-                resp = SESSION.get(resp.headers.get("Location", url), timeout=20)
+                resp = _send(bucket, resp.headers.get("Location", url))
+            _throttled(bucket, resp)
             resp.raise_for_status()
             return resp
         except requests.RequestException as e:
             last_err = e
+            if attempt < max_retries:
+                time.sleep(_backoff(attempt))
     raise last_err
+
+
+def get_text(url: str, max_retries: int = 3) -> str:
+    """Body of an HTML page, paced and retried by fetch()."""
+    return fetch(url, max_retries=max_retries).text
+
+
+def _send(bucket, url: str, **kwargs) -> requests.Response:
+    bucket.acquire()
+    return _get(url, **kwargs)
+
+
+def _get(url: str, **kwargs) -> requests.Response:
+    """
+    GET url on its host's session, under the host's slot, and record it in
+    RUN_STATS.
+    Every request goes through here, so this is also where --record keeps
+    responses and --replay serves them instead of the network.
+    """
+    key = _cache_key(url, kwargs.get("params"))
+    if kwargs.get("timeout") is None:
+        host = urlsplit(url).netloc.lower()
+        kwargs["timeout"] = PROFILE_TIMEOUTS.get(_profile(host), DEFAULT_TIMEOUT)
+    with host_slot(url):
+        start = time.perf_counter()
+        try:
+            if ARCHIVE.replaying:
+                resp = ARCHIVE.serve(key)
+            else:
+                resp = session_for(url).get(_route(url), **kwargs)
+        except requests.RequestException:
+            RUN_STATS.request(url, time.perf_counter() - start, error=True)
+            raise
+    RUN_STATS.request(url, time.perf_counter() - start, len(resp.content), resp.status_code)
+    if ARCHIVE.recording:
+        ARCHIVE.add(key, resp)
+    return resp
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given (1-based) attempt."""
+    if ARCHIVE.replaying:
+        return 0.0
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def _retry_after(resp: requests.Response) -> float | None:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date)."""
+    value = (resp.headers.get("Retry-After") or "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _throttled(bucket, resp: requests.Response) -> None:
+    """On 429/503, pause the host for Retry-After before the caller retries."""
+    if resp.status_code in THROTTLE_STATUSES and not ARCHIVE.replaying:
+        wait = _retry_after(resp)
+        if wait is not None:
+            print(f"[http] {resp.status_code} from {resp.url}; waiting {wait:.0f}s (Retry-After)")
+            bucket.pause(min(wait, BACKOFF_CAP * 10))
+
+
+def _cache_key(url: str, params: dict | None = None) -> str:
+    if not params:
+        return url
+    sep = "&" if "?" in url else "?"
+    return f"{url}{sep}{urlencode(sorted(params.items()))}"
+
+
+def _cached_response(key: str, entry: dict) -> requests.Response:
+    """Rebuild a 200 Response from a disk cache entry."""
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.url = key
+    resp._content = entry["body"]
+    resp.encoding = entry.get("encoding")
+    return resp
+
+
+def _remember(key: str, resource: str, entry: dict | None,
+              resp: requests.Response) -> requests.Response:
+    """
+    Turn a live response into what the caller sees: a 304 serves the stored
+    body (and marks it fresh), a 200 is written to the disk cache.
+    """
+    if resp.status_code == 304 and entry:
+        DISK_CACHE.count("revalidated")
+        DISK_CACHE.touch(key, entry)
+        return _cached_response(key, entry)
+
+    DISK_CACHE.count("misses")
+    DISK_CACHE.store(
+        key,
+        resource,
+        resp.content,
+        etag=resp.headers.get("ETag"),
+        last_modified=resp.headers.get("Last-Modified"),
+        encoding=resp.encoding,
+    )
+    return resp
+
+
+def get_json(url: str, params: dict | None = None, headers: dict | None = None,
+             timeout: float | None = None, resource: str = "default",
+             stale_before: float | None = None):
+    """
+    GET a JSON document through the run cache and the disk cache.
+
+    Repeated or concurrent calls for the same URL (+params) within a run share
+    a single request; it goes out with the host's header profile plus
+    `headers`. Across runs, `resource` picks the disk cache TTL; stale
+    entries (and any stored before `stale_before`) are revalidated with a
+    conditional GET. Errors are raised to the caller and not cached.
+    """
+    key = _cache_key(url, params)
+
+    def load():
+        entry = DISK_CACHE.lookup(key)
+        if entry and DISK_CACHE.is_fresh(entry, stale_before):
+            DISK_CACHE.count("hits")
+            return _cached_response(key, entry).json()
+
+        req_headers = {**(headers or {}), **DISK_CACHE.validators(entry)}
+        bucket = host_bucket(url)
+        bucket.acquire()
+        resp = _get(url, params=params, headers=req_headers, timeout=timeout)
+        _throttled(bucket, resp)
+        resp.raise_for_status()
+        return _remember(key, resource, entry, resp).json()
+
+    return RUN_CACHE.get(key, load)
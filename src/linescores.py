@@ -0,0 +1,232 @@
+# src/linescores.py
+
+"""
+Per-game results ledger: linescores and final scores of every completed
+game, feeding the quarter-scoring columns (NFL 22–25) and home/road points
+per game (NFL 33/34).
+
+LINESCORES is a JsonStore (<cache_dir>/linescores.json) holding:
+
+- "game/<game_id>"          one entry per completed regular-season game:
+                            {"season", "teams": {abbr:
+                            {"home_away", "score", "periods": [q1, q2, ...]}}}
+
+Linescores come from the scoreboard events we already download (each
+competitor carries its per-period points). A game is added once, when it is
+first seen final, so per-team averages never need a season re-pull or
+any request beyond the scoreboard.
+
+Both sets of columns are computed as of a date: only games the SCHEDULE
+index lists on ET days strictly before it count (sums_before), so a row
+never contains its own game's result and the numbers don't depend on how
+far the ledger has been filled.
+
+CLI:
+    python -m src.linescores seed --season 2025
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Iterable
+
+from .schedule import (
+    SCHEDULE,
+    _is_final,
+    _parse_date,
+    get_scoreboard_events,
+    season_range,
+)
+from .runstats import timed
+from .store import JsonStore
+
+LINESCORES = JsonStore()
+_update_lock = threading.Lock()
+
+# Only regular-season games count, same as the ESPN team stats (type 2)
+REGULAR_SEASON = 2
+
+# column -> running-sum field averaged per game
+QUARTER_COLUMNS = {
+    "NFL 22": "q1_for",
+    "NFL 23": "q4_for",
+    "NFL 24": "q1_against",
+    "NFL 25": "q4_against",
+}
+
+
+def _game_entry(ev: dict) -> dict | None:
+    """Store entry for a completed regular-season event, or None."""
+    if not _is_final(ev):
+        return None
+    season = ev.get("season") or {}
+    if season.get("type") != REGULAR_SEASON or not season.get("year"):
+        return None
+
+    comps = ev.get("competitions") or []
+    competitors = (comps[0].get("competitors") if comps else None) or []
+    if len(competitors) != 2:
+        return None
+
+    teams = {}
+    for c in competitors:
+        abbr = (c.get("team") or {}).get("abbreviation")
+        periods = [float(p.get("value") or 0) for p in c.get("linescores") or []]
+        if not abbr or len(periods) < 4:
+            return None
+        try:
+            score = float(c.get("score"))
+        except (TypeError, ValueError):
+            score = sum(periods)
+        teams[abbr] = {
+            "home_away": "H" if c.get("homeAway") == "home" else "A",
+            "score": score,
+            "periods": periods,
+        }
+
+    return {"season": season["year"], "teams": teams}
+
+
+def update(events: Iterable[dict]) -> int:
+    """
+    Add every completed game in events that isn't stored yet. Returns the
+    number of new games.
+    """
+    added = 0
+    with _update_lock:
+        for ev in events:
+            gid = ev.get("id")
+            if not gid or f"game/{gid}" in LINESCORES:
+                continue
+            game = _game_entry(ev)
+            if game is None:
+                continue
+            LINESCORES.set(f"game/{gid}", game)
+            added += 1
+    if added:
+        print(f"[linescores] stored {added} new games")
+    return added
+
+
+@timed("linescores")
+def refresh(season: int, target_date: str | None = None) -> None:
+    """
+    Bring the store up to date for target_date from the local schedule
+    index (which fetches only what isn't final yet). Games already stored
+    are skipped, so this is cheap to call every run.
+    """
+    end = _day(target_date)
+    first, last = season_range(season)
+    if SCHEDULE.ensure(min(end, last)):
+        update(SCHEDULE.events_between(first, min(end, last)))
+    LINESCORES.save()
+
+
+def _day(as_of: str | None) -> str:
+    return datetime.strptime(_parse_date(as_of), "%Y%m%d").strftime("%Y-%m-%d")
+
+
+def sums_before(season: int, as_of: str | None = None) -> Dict[str, Dict[str, float]]:
+    """
+    {team: {"games", "q1_for", "q4_for", "q1_against", "q4_against",
+    "home_games", "home_pts", "road_games", "road_pts"}} over the season's
+    stored games that SCHEDULE lists on ET days strictly before as_of
+    (YYYY-MM-DD, default today). The season must already be indexed
+    (refresh() makes sure); nothing is fetched here.
+    """
+    cutoff = _day(as_of)
+    first, _ = season_range(season)
+    sums: Dict[str, Dict[str, float]] = {}
+    for day, events in SCHEDULE.by_date(first, cutoff).items():
+        if day >= cutoff:
+            continue
+        for ev in events:
+            game = LINESCORES.get(f"game/{ev.get('id')}")
+            if game and game.get("season") == season:
+                _add_game(sums, game)
+    return sums
+
+
+def _add_game(sums: Dict[str, Dict[str, float]], game: dict) -> None:
+    """Add one stored game to both teams' sums."""
+    (a, sa), (b, sb) = game["teams"].items()
+    for team, own, opp in ((a, sa, sb), (b, sb, sa)):
+        t = sums.setdefault(team, {})
+        t["games"] = t.get("games", 0) + 1
+        t["q1_for"] = t.get("q1_for", 0) + own["periods"][0]
+        t["q4_for"] = t.get("q4_for", 0) + own["periods"][3]
+        t["q1_against"] = t.get("q1_against", 0) + opp["periods"][0]
+        t["q4_against"] = t.get("q4_against", 0) + opp["periods"][3]
+        side = "home" if own["home_away"] == "H" else "road"
+        t[f"{side}_games"] = t.get(f"{side}_games", 0) + 1
+        t[f"{side}_pts"] = t.get(f"{side}_pts", 0) + own["score"]
+
+
+def get_quarter_scoring(teams: Iterable[str], season: int,
+                        as_of: str | None = None) -> Dict[str, Dict[str, float]]:
+    """
+    {team: {"NFL 22": ..., "NFL 25": ...}} per-game quarter averages over
+    the games before as_of (see sums_before); 0.0 for teams without any.
+    """
+    before = sums_before(season, as_of)
+    out = {}
+    for team in teams:
+        sums = before.get(team) or {}
+        games = sums.get("games") or 0
+        out[team] = {
+            col: round(sums.get(field, 0) / games, 2) if games else 0.0
+            for col, field in QUARTER_COLUMNS.items()
+        }
+    return out
+
+
+def get_home_road_ppg(teams: Iterable[str], season: int,
+                      as_of: str | None = None) -> Dict[str, Dict[str, float]]:
+    """
+    {team: {"NFL 33": road_ppg, "NFL 34": home_ppg}} over the games before
+    as_of (see sums_before). A side with no games yet is left out, so its
+    column stays blank.
+    """
+    before = sums_before(season, as_of)
+    out = {}
+    for team in teams:
+        sums = before.get(team) or {}
+        row = {}
+        if sums.get("road_games"):
+            row["NFL 33"] = round(sums["road_pts"] / sums["road_games"], 2)
+        if sums.get("home_games"):
+            row["NFL 34"] = round(sums["home_pts"] / sums["home_games"], 2)
+        if row:
+            out[team] = row
+    return out
+
+
+def seed(season: int) -> int:
+    """Load every completed game of a season (one scoreboard request)."""
+    added = update(get_scoreboard_events(*season_range(season)))
+    LINESCORES.save()
+    return added
+
+
+def main() -> None:
+    import os
+
+    from .utils import load_settings
+
+    parser = argparse.ArgumentParser(description="NFL pilot linescore store")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("seed", help="Load every completed game of one or more seasons")
+    s.add_argument("--season", type=int, action="append", required=True,
+                   help="Season year, e.g. 2025 (repeatable)")
+    args = parser.parse_args()
+
+    cache_dir = load_settings().get("cache_dir") or "data/cache"
+    LINESCORES.open(os.path.join(cache_dir, "linescores.json"))
+    for season in args.season:
+        print(f"[linescores] season {season}: {seed(season)} new games")
+
+
+if __name__ == "__main__":
+    main()
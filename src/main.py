@@ -1,97 +1,269 @@
 ﻿from __future__ import annotations
 
 import argparse
+import os
+import time
 from typing import Dict, List, Any
 
-from .utils import load_settings, ensure_dirs, today_et, read_schema
-from .schedule import get_matchups
-from .team_stats import get_team_metrics
-from .derived import get_home_road_ppg
-from .output import write_csv
+import pandas as pd
 
+from . import history, http, linescores, pool
+from .cache import DISK_CACHE, RUN_CACHE
+from .utils import load_settings, ensure_dirs, today_et, schema_columns
+from .manifest import RunManifest
+from .runstats import RUN_STATS, timed
+from .schedule import SCHEDULE, get_matchups, last_final_by_team
+from .team_stats import METRIC_SPEC, _season_and_type, get_team_metrics, select_teams
+from .derived import get_home_road_ppg, get_pfr_fallbacks
+from .pipeline import Pipeline
+from .starters import ATHLETE_STATS, get_starter_columns
+from .sources.pfr import PFR_PAGES
+from .output import write_outputs
+from .replay import ARCHIVE
 
-def build_row(
+
+MATCHUP_COLUMNS = ["game_id", "team", "opponent", "home_away"]
+
+# A team's season stats only move once one of its games has gone final.
+# Finals newer than this may not be in ESPN's numbers yet, so stages that
+# depend on them are recomputed until they settle.
+STATS_SETTLE_SECONDS = 6 * 3600
+
+
+def _team_stats_inputs(teams, finals, season, **extra) -> dict | None:
+    """
+    Manifest inputs for a stage built from season-level team stats, or None
+    (always recompute) when the game state is unknown or still settling.
+    """
+    if finals is None:
+        return None
+    scope = sorted(teams) if teams is not None else sorted(finals)
+    relevant = {t: finals.get(t) for t in scope}
+    now = time.time()
+    if any(done and now - done < STATS_SETTLE_SECONDS for done in relevant.values()):
+        return None
+    return {
+        "teams": sorted(teams) if teams is not None else "all",
+        "season": season,
+        "finals": relevant,
+        **extra,
+    }
+
+
+def _stats_settled_at(teams, finals) -> float | None:
+    """
+    When ESPN's numbers for `teams` settled after their latest final (capped
+    at now), or None when no final is known. Disk cache copies stored before
+    this may predate a final, so stages recomputing from them revalidate.
+    """
+    if not finals:
+        return None
+    scope = teams if teams is not None else finals
+    done = [finals[t] for t in scope if finals.get(t)]
+    if not done:
+        return None
+    return min(time.time(), max(done) + STATS_SETTLE_SECONDS)
+
+
+@timed("build")
+def build_frame(
     date_str: str,
-    game_id: str,
-    team: str,
-    opponent: str,
-    home_away: str,
-    schema: List[str],
-    team_metrics: Dict[str, Dict[str, Any]],
-    home_road: Dict[str, Dict[str, Any]] | None = None,
-) -> Dict[str, Any]:
+    matchups: List[tuple],
+    schema: pd.Index,
+    *team_tables: Dict[str, Dict[str, Any]] | None,
+) -> pd.DataFrame:
     """
-    Build one output row for team vs opponent.
+    Build the output frame for a slate in one join.
 
-    - Ensures every column in schema exists in the row.
-    - Fills from team_metrics, then home/road splits.
+    - matchups: (game_id, team, opponent, home_away) rows from get_matchups.
+    - team_tables: {team: {column: value}} dicts (team metrics, home/road
+      splits, ...). They are stacked into one team table, later tables
+      winning where they overlap, and joined onto the matchups by team.
+    - Columns come out in schema order; anything missing is a blank string.
     """
-    row: Dict[str, Any] = {
-        "game_date": date_str,
-        "game_id": game_id,
-        "team": team,
-        "opponent": opponent,
-        "home_away": home_away,
-    }
+    frame = pd.DataFrame(matchups, columns=MATCHUP_COLUMNS)
+    frame.insert(0, "game_date", date_str)
+
+    teams = None
+    for table in team_tables:
+        if not table:
+            continue
+        t = pd.DataFrame.from_dict(table, orient="index")
+        teams = t if teams is None else t.combine_first(teams)
+
+    if teams is not None:
+        teams = teams[teams.columns.intersection(schema).difference(frame.columns)]
+        frame = frame.join(teams, on="team")
+
+    frame = frame.reindex(columns=schema).astype(object)
+    return frame.where(frame.notna(), "")
+
+
+def setup_run(settings: dict, use_cache: bool = True, refresh: bool = False) -> RunManifest:
+    """
+    Per-run setup shared by run() and backfill: fresh run cache, pool
+    limits and host sessions, disk cache, athlete store and output dirs.
+    Returns the run's manifest.
+    """
+    # Fresh response store and stats per run; within the run each URL is
+    # fetched once
+    RUN_CACHE.clear()
+    RUN_STATS.reset()
+    pool.configure(
+        max_workers=settings.get("max_workers"),
+        max_per_host=settings.get("max_in_flight_per_host"),
+        # A replay never touches the hosts, so it isn't paced either
+        host_rates={} if ARCHIVE.replaying else settings.get("host_rate_limits"),
+    )
+    # Host sessions size their connection pools from the limits just set
+    http.close_sessions()
+    http.set_host_overrides(settings.get("host_overrides"))
+    DISK_CACHE.configure(
+        settings.get("cache_dir"),
+        ttls=settings.get("cache_ttl_seconds"),
+        enabled=use_cache,
+        refresh=refresh,
+    )
+    cache_dir = settings.get("cache_dir")
+    ATHLETE_STATS.open(
+        os.path.join(cache_dir, "athlete_stats.json") if use_cache and cache_dir else None
+    )
+    SCHEDULE.open(os.path.join(cache_dir, "schedule.json") if use_cache and cache_dir else None)
+    linescores.LINESCORES.open(
+        os.path.join(cache_dir, "linescores.json") if use_cache and cache_dir else None
+    )
+    PFR_PAGES.open(os.path.join(cache_dir, "pfr") if use_cache and cache_dir else None)
+    manifest = RunManifest(cache_dir if use_cache else None)
+    if refresh:
+        ATHLETE_STATS.clear()
+        PFR_PAGES.clear()
+        SCHEDULE.clear()
+        manifest.invalidate()
+    ensure_dirs(settings["output_dir"], settings["archive_dir"], settings["log_dir"])
+    return manifest
+
 
-    # Initialize all schema columns as blank strings so CSV has no missing keys
-    for col in schema:
-        if col not in row:
-            row[col] = ""
+def finish_run(settings: dict, **extra) -> None:
+    """Print the cache/metrics summary and write the JSON run report."""
+    if DISK_CACHE.enabled:
+        print(f"[cache] {DISK_CACHE.summary()}")
+    path = RUN_STATS.write_report(settings["output_dir"], extra)
+    for line in RUN_STATS.summary():
+        print(line)
+    print(f"[runstats] report → {path}")
 
-    # Team-level metrics
-    m = team_metrics.get(team, {})
-    for k, v in m.items():
-        if k in row and v is not None:
-            row[k] = v
 
-    # Home/Road splits
-    if home_road is not None:
-        hr = home_road.get(team, {})
-        for k, v in hr.items():
-            if k in row and v is not None:
-                row[k] = v
+def run(
+    target_date: str | None = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+) -> None:
+    """
+    Build and write the feed for one date as a stage graph (src/pipeline.py):
 
-    return row
+        matchups                   → finals, teams, ledger
+        teams + finals             → team_metrics   (ESPN team stats, NFL 5-32)
+        teams                      → starters       (depth charts, NFL 1-4)
+        teams + ledger             → home_road, quarters
+        teams + finals + home_road → pfr            (PFR fallback for NFL 33/34)
+        all of the above           → frame → write
 
+    Stages run as soon as their inputs are ready, so the ESPN team stats,
+    depth charts/starters and ledger work overlap; PFR is only asked for
+    columns the other stages left empty.
 
-def run(target_date: str | None = None) -> None:
+    team_metrics and pfr go through the run manifest and are reused while
+    their teams' finals are unchanged. starters is not: depth charts move
+    on days without games (injuries, signings), so finals can't tell when
+    it is unchanged. Its requests are bounded instead by the depth chart
+    TTL and the athlete store, which refetches a player only after a final.
+    """
     settings = load_settings()
-    ensure_dirs(settings["output_dir"], settings["archive_dir"], settings["log_dir"])
-    schema = read_schema()
+    manifest = setup_run(settings, use_cache, refresh)
+    schema = schema_columns()
 
     # Determine date
     if target_date:
         date_str = target_date
     else:
         date_str = str(today_et(settings.get("timezone", "America/New_York")))
+    season, _ = _season_and_type(date_str)
+    latest_path = f'{settings["output_dir"]}/{settings["latest_filename"]}'
 
-    matchups = get_matchups(date_str)
+    def slate_teams(matchups):
+        # Only fetch stats for teams on the slate unless league-wide mode is set
+        if not matchups:
+            return set()
+        if settings.get("only_teams_playing_today", True):
+            return {team for (_, team, _, _) in matchups}
+        return None
 
-    if not matchups:
-        print(f"No NFL games found for {date_str}; writing empty file.")
-        rows: List[Dict[str, Any]] = []
-    else:
-        team_metrics = get_team_metrics()
-        home_road = get_home_road_ppg()
-
-        rows = [
-            build_row(
-                date_str=date_str,
-                game_id=game_id,
-                team=team,
-                opponent=opp,
-                home_away=ha,
-                schema=schema,
-                team_metrics=team_metrics,
-                home_road=home_road,
-            )
-            for (game_id, team, opp, ha) in matchups
-        ]
+    def team_metrics(teams, finals):
+        # Reuses last run's team metrics when the stage inputs hash the same
+        return manifest.stage(
+            "team_metrics",
+            _team_stats_inputs(teams, finals, season, spec=METRIC_SPEC),
+            lambda: get_team_metrics(teams, season, _stats_settled_at(teams, finals)),
+        )
 
-    latest_path = f'{settings["output_dir"]}/{settings["latest_filename"]}'
-    write_csv(rows, schema, latest_path, settings["archive_dir"])
-    print(f"✅ wrote {len(rows)} rows → {latest_path}")
+    def pfr(teams, finals, home_road):
+        # Only games before date_str count, so the date is part of the inputs
+        return manifest.stage(
+            "pfr",
+            _team_stats_inputs(teams, finals, season, as_of=date_str, home_road=home_road),
+            lambda: get_pfr_fallbacks([home_road], teams, season, date_str),
+        )
+
+    def frame(matchups, pfr, team_metrics, home_road, quarters, starters):
+        if not matchups:
+            print(f"No NFL games found for {date_str}; writing empty file.")
+            return build_frame(date_str, [], schema)
+        # PFR fallbacks go first so every other source wins where both have a value
+        return build_frame(
+            date_str, matchups, schema, pfr, team_metrics, home_road, quarters, starters
+        )
+
+    def write(frame):
+        written = write_outputs(
+            frame,
+            latest_path,
+            settings["archive_dir"],
+            formats=settings.get("output_formats") or ["csv"],
+        )
+        if written:
+            print(f"✅ wrote {len(frame)} rows → {', '.join(str(p) for p in written)}")
+            if settings.get("history_path"):
+                history.append(frame, settings["history_path"])
+        else:
+            print(f"✅ {len(frame)} rows unchanged → {latest_path} left as is")
+        return written
+
+    dag = Pipeline("pipeline")
+    dag.add("matchups", lambda: get_matchups(date_str), required=True)
+    dag.add("finals", lambda: last_final_by_team(date_str), after=["matchups"])
+    dag.add("teams", slate_teams, needs=["matchups"])
+    dag.add("team_metrics", team_metrics, needs=["teams", "finals"])
+    # Home/road PPG and quarter scoring come from the local results ledger
+    dag.add("ledger", lambda: linescores.refresh(season, date_str), after=["matchups"])
+    dag.add("home_road", lambda teams: get_home_road_ppg(teams, season, date_str),
+            needs=["teams"], after=["ledger"])
+    dag.add("quarters",
+            lambda teams: linescores.get_quarter_scoring(select_teams(teams), season, date_str),
+            needs=["teams"], after=["ledger"])
+    dag.add("starters", lambda teams: get_starter_columns(teams, date_str, season),
+            needs=["teams"])
+    dag.add("pfr", pfr, needs=["teams", "finals", "home_road"])
+    dag.add("frame", frame,
+            needs=["matchups", "pfr", "team_metrics", "home_road", "quarters", "starters"],
+            required=True)
+    dag.add("write", write, needs=["frame"], required=True)
+    results = dag.run()
+
+    manifest.save()
+    for line in dag.summary():
+        print(line)
+    finish_run(settings, mode="daily", date=date_str, rows=len(results["frame"]),
+               written=[str(p) for p in results["write"]], pipeline=dag.report())
 
 
 def main() -> None:
@@ -101,8 +273,63 @@ def main() -> None:
         help="Target date in YYYY-MM-DD (defaults to today ET)",
         default=None,
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the on-disk HTTP cache (no reads, no writes)",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Treat every cached response as stale and revalidate it",
+    )
+    parser.add_argument("--start", help="Backfill: first date YYYY-MM-DD (inclusive)")
+    parser.add_argument("--end", help="Backfill: last date YYYY-MM-DD (inclusive)")
+    parser.add_argument(
+        "--season",
+        type=int,
+        help="Backfill a whole season (e.g. 2024); --start/--end narrow it",
+    )
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument(
+        "--record",
+        metavar="DIR",
+        help="Save every HTTP response of this run to DIR/http_archive.zip (disk cache off)",
+    )
+    archive.add_argument(
+        "--replay",
+        metavar="DIR",
+        help="Serve every HTTP request from DIR/http_archive.zip, no network (disk cache off)",
+    )
     args = parser.parse_args()
-    run(target_date=args.date)
+
+    # Recording/replaying runs cold so the archive covers every request
+    use_cache = not (args.no_cache or args.record or args.replay)
+    if args.record:
+        ARCHIVE.record(args.record)
+    elif args.replay:
+        ARCHIVE.replay(args.replay)
+    try:
+        _dispatch(args, use_cache)
+    finally:
+        ARCHIVE.close()
+
+
+def _dispatch(args, use_cache: bool) -> None:
+    """Run the daily feed or, with --start/--end/--season, a backfill."""
+    if args.start or args.end or args.season:
+        from .backfill import run_backfill
+
+        run_backfill(
+            start=args.start,
+            end=args.end,
+            season=args.season,
+            use_cache=use_cache,
+            refresh=args.refresh,
+        )
+        return
+
+    run(target_date=args.date, use_cache=use_cache, refresh=args.refresh)
 
 
 if __name__ == "__main__":
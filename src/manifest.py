@@ -0,0 +1,75 @@
+# src/manifest.py
+
+"""
+Run manifest for incremental runs.
+
+Each pipeline stage is run through RunManifest.stage(name, inputs, compute):
+
+- `inputs` is anything JSON-serialisable that fully determines the stage's
+  output (teams, season, which games have gone final, spec/settings ...).
+  Its content hash is stored in <cache_dir>/manifest.json.
+- If the hash matches the last run and the stage's saved output exists,
+  that output is returned and compute() is never called (no network I/O).
+- Otherwise compute() runs; its output is saved to
+  <cache_dir>/stages/<name>.json, but only rewritten if its content changed.
+
+Passing inputs=None means "can't tell" and always recomputes.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from .store import JsonStore
+from .utils import atomic_write
+
+
+def content_hash(obj: Any) -> str:
+    blob = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class RunManifest:
+    def __init__(self, cache_dir: str | None = None):
+        self.root = Path(cache_dir) if cache_dir else None
+        self._entries = JsonStore(self.root / "manifest.json" if self.root else None)
+
+    def _output_path(self, name: str) -> Path:
+        return self.root / "stages" / f"{name}.json"
+
+    def invalidate(self) -> None:
+        """Forget every stage's inputs so the next stage() calls recompute."""
+        self._entries.clear()
+
+    def stage(self, name: str, inputs: Any, compute: Callable[[], Any]) -> Any:
+        entry = self._entries.get(name) or {}
+        key = content_hash(inputs) if inputs is not None else None
+
+        if self.root and key and entry.get("inputs") == key:
+            try:
+                out = json.loads(self._output_path(name).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                pass
+            else:
+                print(f"[manifest] {name}: inputs unchanged, reusing last output")
+                return out
+
+        out = compute()
+        if not self.root:
+            return out
+
+        out_hash = content_hash(out)
+        if entry.get("output") != out_hash or not self._output_path(name).exists():
+            atomic_write(self._output_path(name), json.dumps(out, sort_keys=True).encode("utf-8"))
+
+        self._entries.set(name, {
+            "inputs": key,
+            "output": out_hash,
+            "updated_at": time.time(),
+        })
+        return out
+
+    def save(self) -> None:
+        self._entries.save()
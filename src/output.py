@@ -1,20 +1,148 @@
-import csv
+import gzip
+import io
+import os
+import shutil
 from pathlib import Path
 from datetime import datetime
 
-def write_csv(rows, fields, latest_path, archive_dir):
-    # latest
-    Path(latest_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(latest_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fields)
-        w.writeheader()
-        w.writerows(rows)
+from .runstats import timed
+from .utils import atomic_path, atomic_write
 
-    # archive snapshot (UTC date-based filename)
+# Columns that identify a row; everything else is a numeric metric.
+KEY_COLUMNS = ["game_date", "game_id", "team", "opponent", "home_away"]
+
+# output format -> file extension
+FORMATS = {
+    "csv": ".csv",
+    "csv.gz": ".csv.gz",
+    "parquet": ".parquet",
+}
+
+
+def _encode_csv(frame, encoded):
+    return frame.to_csv(index=False, lineterminator="\r\n").encode("utf-8")
+
+
+def _encode_csv_gz(frame, encoded):
+    # mtime=0 keeps the bytes stable when the rows don't change
+    return gzip.compress(_encode("csv", frame, encoded), mtime=0)
+
+
+def _encode_parquet(frame, encoded):
+    import pandas as pd
+
+    typed = frame.mask(frame == "")
+    for col in typed.columns:
+        if col in KEY_COLUMNS:
+            typed[col] = typed[col].astype("string")
+        else:
+            typed[col] = pd.to_numeric(typed[col], errors="coerce")
+    buf = io.BytesIO()
+    typed.to_parquet(buf, index=False)
+    return buf.getvalue()
+
+
+_ENCODERS = {
+    "csv": _encode_csv,
+    "csv.gz": _encode_csv_gz,
+    "parquet": _encode_parquet,
+}
+
+
+def _encode(fmt, frame, encoded):
+    """Serialize frame as fmt once per write; reused by derived formats."""
+    if fmt not in encoded:
+        encoded[fmt] = _ENCODERS[fmt](frame, encoded)
+    return encoded[fmt]
+
+
+def _same_bytes(path: Path, data: bytes) -> bool:
+    try:
+        return path.stat().st_size == len(data) and path.read_bytes() == data
+    except OSError:
+        return False
+
+
+def _write_if_changed(path: Path, data: bytes) -> bool:
+    """Write data to path atomically; False if it was already there."""
+    if _same_bytes(path, data):
+        return False
+    atomic_write(path, data)
+    return True
+
+
+def _link_or_copy(src: Path, dst: Path, data: bytes) -> None:
+    """
+    Put src's bytes (data) at dst by hardlink, falling back to a byte copy.
+
+    Safe to hardlink because latest files are always replaced by rename, so
+    the next run gets a new inode and the archive copy is left as is.
+    """
+    if _same_bytes(dst, data):
+        return
+    with atomic_path(dst) as tmp:
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+
+
+def _output_path(path, fmt) -> Path:
+    """latest.csv -> latest.csv / latest.csv.gz / latest.parquet"""
+    path = Path(path)
+    stem = path.name.split(".")[0]
+    return path.with_name(stem + FORMATS[fmt])
+
+
+@timed("output")
+def write_outputs(frame, latest_path, archive_dir, formats=("csv",)):
+    """
+    Write the assembled output frame (columns already in schema order) as
+    each requested format: latest_path (with that format's extension) plus a
+    UTC-dated snapshot in archive_dir.
+
+    Each format is encoded once; latest files are written atomically
+    (temp file + rename) and the snapshot is a hardlink/copy of them. Files
+    whose bytes wouldn't change are left alone.
+    Returns the latest paths whose content changed.
+    """
     ts = datetime.utcnow().strftime("%Y-%m-%d")
-    apath = Path(archive_dir) / f"{ts}.csv"
-    apath.parent.mkdir(parents=True, exist_ok=True)
-    with open(apath, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fields)
-        w.writeheader()
-        w.writerows(rows)
+    encoded = {}
+    written = []
+
+    for fmt in formats:
+        if fmt not in _ENCODERS:
+            print(f"[output] unknown output format {fmt!r}; skipping")
+            continue
+        try:
+            data = _encode(fmt, frame, encoded)
+        except ImportError:
+            # parquet needs pyarrow (or fastparquet), which is optional
+            print(f"[output] {fmt} output needs pyarrow installed; skipping")
+            continue
+
+        latest = _output_path(latest_path, fmt)
+        if _write_if_changed(latest, data):
+            written.append(latest)
+        _link_or_copy(latest, _output_path(Path(archive_dir) / ts, fmt), data)
+
+    return written
+
+
+@timed("output")
+def write_csv_stream(frames, path):
+    """
+    Stream frames (same columns, schema order) into one CSV at path as they
+    arrive, so a long backfill never holds every row in memory. The header
+    comes from the first frame; the file is written to a temp name and
+    renamed into place when the stream ends. Returns the row count.
+    """
+    rows = 0
+    header = True
+    with atomic_path(path) as tmp, open(tmp, "wb") as f:
+        for frame in frames:
+            text = frame.to_csv(index=False, header=header, lineterminator="\r\n")
+            f.write(text.encode("utf-8"))
+            header = False
+            rows += len(frame)
+    return rows
@@ -0,0 +1,157 @@
+# src/pipeline.py
+
+"""
+Small stage-graph runner for main.run().
+
+Each stage has a name (its output), the names of the stages it needs
+(its inputs) and a function called with those outputs as keyword
+arguments. `after` lists stages that only have to finish first (their
+output isn't passed), e.g. a store being filled:
+
+    dag = Pipeline("run")
+    dag.add("matchups", lambda: get_matchups(day))
+    dag.add("teams", teams_on_slate, needs=("matchups",))
+    dag.add("team_metrics", lambda teams: get_team_metrics(teams), needs=("teams",))
+    dag.add("ledger", refresh_ledger, after=("matchups",))
+    results = dag.run()
+
+A stage starts as soon as everything it needs is done, so independent
+stages overlap. Stages run on their own threads (not the shared pool), so
+the per-team work inside them still fans out through pool.map_teams and
+shares its per-host limits.
+
+A stage that raises is logged and its output is None, like the per-team
+loops that leave a failed team out; stages that need it still run. A
+stage added with required=True instead stops the run: run() re-raises its
+error once the stages already running have finished.
+
+After run(), report() has each stage's start/end offsets and the critical
+path: the chain of stages, following the last input to finish, that
+decided the run's wall time.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List
+
+
+class Pipeline:
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self._stages: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.failed: Dict[str, str] = {}
+        self.wall_s = 0.0
+        self._t0 = 0.0
+
+    def add(self, name: str, fn: Callable[..., Any], needs: Iterable[str] = (),
+            after: Iterable[str] = (), required: bool = False) -> "Pipeline":
+        """Register stage `name`: fn(**{need: output}) once every need and after is done."""
+        if name in self._stages:
+            raise ValueError(f"duplicate stage {name!r}")
+        self._stages[name] = (fn, tuple(needs), tuple(after), required)
+        return self
+
+    def _deps(self, name: str) -> tuple:
+        _, needs, after, _ = self._stages[name]
+        return needs + after
+
+    def _check(self) -> None:
+        for name in self._stages:
+            unknown = [n for n in self._deps(name) if n not in self._stages]
+            if unknown:
+                raise ValueError(f"stage {name!r} needs unknown stage(s) {unknown}")
+
+    def _call(self, name: str) -> None:
+        fn, needs, _, required = self._stages[name]
+        with self._lock:
+            kwargs = {n: self.results.get(n) for n in needs}
+        start = time.perf_counter()
+        out = None
+        try:
+            out = fn(**kwargs)
+        except Exception as e:
+            print(f"[{self.name}] stage {name} failed: {e}")
+            with self._lock:
+                self.failed[name] = str(e)
+            if required:
+                raise
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.results[name] = out
+                self.timings[name] = {"start_s": start - self._t0, "end_s": end - self._t0}
+
+    def run(self) -> Dict[str, Any]:
+        """Run every stage (independent ones concurrently); returns {name: output}."""
+        self._check()
+        self.results, self.timings, self.failed = {}, {}, {}
+        self._t0 = time.perf_counter()
+        pending = dict(self._stages)
+        done: set = set()
+        running: Dict[Any, str] = {}
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, len(pending)), thread_name_prefix=f"{self.name}-stage"
+        ) as executor:
+            while pending or running:
+                ready = [n for n in pending if all(d in done for d in self._deps(n))]
+                for name in ready:
+                    del pending[name]
+                    running[executor.submit(self._call, name)] = name
+                if not running:
+                    raise ValueError(f"dependency cycle among stages {sorted(pending)}")
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    done.add(running.pop(fut))
+                    fut.result()
+        self.wall_s = time.perf_counter() - self._t0
+        return dict(self.results)
+
+    def critical_path(self) -> List[str]:
+        """Stages on the longest chain, first to last (empty before run())."""
+        if not self.timings:
+            return []
+        name = max(self.timings, key=lambda n: self.timings[n]["end_s"])
+        path = [name]
+        while True:
+            deps = self._deps(name)
+            if not deps:
+                break
+            name = max(deps, key=lambda n: self.timings[n]["end_s"])
+            path.append(name)
+        return path[::-1]
+
+    def report(self) -> Dict[str, Any]:
+        """Per-stage offsets and durations plus the critical path, for run_report.json."""
+        stages = {
+            name: {
+                "needs": list(self._deps(name)),
+                "start_s": round(t["start_s"], 4),
+                "end_s": round(t["end_s"], 4),
+                "wall_s": round(t["end_s"] - t["start_s"], 4),
+                **({"error": self.failed[name]} if name in self.failed else {}),
+            }
+            for name, t in self.timings.items()
+        }
+        path = self.critical_path()
+        return {
+            "wall_s": round(self.wall_s, 4),
+            "stages": stages,
+            "critical_path": path,
+            "critical_path_s": round(sum(stages[n]["wall_s"] for n in path), 4),
+        }
+
+    def summary(self) -> List[str]:
+        """Short human-readable lines for stdout."""
+        r = self.report()
+        chain = " → ".join(f"{n} {r['stages'][n]['wall_s']:.2f}s" for n in r["critical_path"])
+        busy = sum(s["wall_s"] for s in r["stages"].values())
+        return [
+            f"[{self.name}] {len(r['stages'])} stages in {r['wall_s']:.2f}s "
+            f"({busy:.2f}s of stage time)",
+            f"[{self.name}] critical path: {chain}",
+        ]
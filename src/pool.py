@@ -0,0 +1,184 @@
+# src/pool.py
+
+"""
+Shared bounded-concurrency executor for the per-team loops.
+
+- map_teams(fn, teams) runs fn(team) for every team on one shared thread pool
+  and returns {team: result} in the order the teams were given, so output is
+  identical to the old sequential loops. imap(fn, items) is the streaming
+  form, yielding (item, result) pairs in order as they complete.
+- host_slot(url) is a per-host semaphore; http.py holds it around every
+  request so no host sees more than `max_in_flight_per_host` at once.
+- host_bucket(url) is a per-host token bucket (rate/s + burst) that http.py
+  takes a token from before every request. Hosts without a configured rate
+  are unthrottled; a bucket can also be paused (e.g. for Retry-After).
+
+All limits come from config/settings.yaml via configure().
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_MAX_PER_HOST = 8
+# host -> {"rate": requests/second, "burst": bucket size}
+DEFAULT_HOST_RATES = {
+    "www.pro-football-reference.com": {"rate": 0.33, "burst": 2},
+}
+
+_lock = threading.Lock()
+_local = threading.local()
+_executor: ThreadPoolExecutor | None = None
+_max_workers = DEFAULT_MAX_WORKERS
+_max_per_host = DEFAULT_MAX_PER_HOST
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+_host_rates: Dict[str, Dict] = dict(DEFAULT_HOST_RATES)
+_host_buckets: Dict[str, "TokenBucket"] = {}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: up to `burst` requests back to back, then
+    `rate` per second. rate None/0 means no rate limit (pauses still apply).
+    """
+
+    def __init__(self, rate: float | None = None, burst: int = 1):
+        self.rate = float(rate) if rate else None
+        self.burst = max(1, int(burst or 1))
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+        self._not_before = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request may go out, then take a token."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._not_before:
+                    wait = self._not_before - now
+                elif not self.rate:
+                    return
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                    self._stamp = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every request to this host for `seconds` from now."""
+        with self._lock:
+            self._not_before = max(self._not_before, time.monotonic() + seconds)
+
+
+def configure(
+    max_workers: int | None = None,
+    max_per_host: int | None = None,
+    host_rates: Dict[str, Dict] | None = None,
+) -> None:
+    """
+    Set pool size / per-host in-flight limit / per-host rates. Takes effect
+    for new work; an existing executor is shut down and rebuilt lazily.
+    """
+    global _executor, _max_workers, _max_per_host
+    with _lock:
+        if max_workers:
+            _max_workers = int(max_workers)
+        if max_per_host:
+            _max_per_host = int(max_per_host)
+        if host_rates is not None:
+            _host_rates.clear()
+            _host_rates.update({h.lower(): v or {} for h, v in host_rates.items()})
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+        _host_slots.clear()
+        _host_buckets.clear()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_max_workers,
+                thread_name_prefix="nfl-pool",
+                initializer=_mark_worker,
+            )
+        return _executor
+
+
+def _mark_worker() -> None:
+    _local.in_pool = True
+
+
+def host_slot(url: str) -> threading.BoundedSemaphore:
+    """Semaphore bounding concurrent requests to url's host."""
+    host = urlsplit(url).netloc.lower()
+    with _lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = threading.BoundedSemaphore(_max_per_host)
+            _host_slots[host] = slot
+        return slot
+
+
+def max_in_flight() -> int:
+    """The per-host in-flight limit (http.py sizes connection pools to it)."""
+    with _lock:
+        return _max_per_host
+
+
+def host_bucket(url: str) -> TokenBucket:
+    """Token bucket pacing requests to url's host."""
+    host = urlsplit(url).netloc.lower()
+    with _lock:
+        bucket = _host_buckets.get(host)
+        if bucket is None:
+            limits = _host_rates.get(host) or {}
+            bucket = TokenBucket(limits.get("rate"), limits.get("burst", 1))
+            _host_buckets[host] = bucket
+        return bucket
+
+
+def map_teams(fn: Callable[[Any], Any], teams: Iterable[Any], label: str = "pool") -> Dict[Any, Any]:
+    """
+    Run fn(team) for each team concurrently and return {team: result} in
+    input order.
+
+    A team whose call raises is logged and left out, same as the old loops
+    that skipped a team on failure. Calls made from inside a pool worker run
+    inline so nested maps can never starve the pool.
+    """
+    return dict(imap(fn, teams, label=label))
+
+
+def imap(fn: Callable[[Any], Any], items: Iterable[Any], label: str = "pool") -> Iterator[Tuple[Any, Any]]:
+    """
+    Like map_teams, but yields (item, result) pairs in input order as soon as
+    each one (and everything before it) is done, so callers can stream
+    results instead of waiting for the whole batch.
+    """
+    items = list(items)
+
+    if getattr(_local, "in_pool", False) or len(items) <= 1:
+        for item in items:
+            try:
+                yield item, fn(item)
+            except Exception as e:
+                print(f"[{label}] {item} failed: {e}")
+        return
+
+    executor = _get_executor()
+    futures = [(item, executor.submit(fn, item)) for item in items]
+    for item, fut in futures:
+        try:
+            yield item, fut.result()
+        except Exception as e:
+            print(f"[{label}] {item} failed: {e}")
@@ -0,0 +1,162 @@
+# src/refs.py
+
+"""
+$ref graph resolver for ESPN's core API (sports.core.api.espn.com/v2).
+
+Core API documents link to each other with {"$ref": url} stubs. resolve()
+takes a root URL and a path spec saying which stubs to expand, and returns
+the document with those stubs replaced by the fetched documents.
+
+Path spec: a nested dict walked alongside the document.
+- a key selects that field,
+- "*" selects every item of a list (or every value of a dict),
+- {} means "stop here".
+Every $ref stub the spec reaches is fetched and the walk continues inside
+the fetched document with the remaining spec. For example:
+
+    {"items": {"*": {}}}
+        expand each entry of root["items"], nothing below it
+
+    {"items": {"*": {"positions": {"*": {"athletes": {"*": {"athlete": {}}}}}}}}
+        ... and also every athlete stub under each chart's positions
+
+Refs are expanded breadth-first: all stubs found at one hop are fetched
+together through pool.map_teams (bounded by the per-host limits), deduped by
+canonical URL, and only then is the next hop walked. Each fetched document
+also goes through http.get_json, so the run/disk caches apply.
+"""
+
+import copy
+from typing import Any, Dict, Iterable, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .http import get_json
+from .pool import map_teams
+
+# Query params ESPN tacks onto every $ref that don't change the document
+_IGNORED_PARAMS = {"lang", "region"}
+
+
+def canonical(url: str) -> str:
+    """Normalise a core API URL so equal documents share one cache key."""
+    parts = urlsplit(url)
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query) if k not in _IGNORED_PARAMS
+    )
+    return urlunsplit(
+        ("https", parts.netloc.lower(), parts.path.rstrip("/"), urlencode(query), "")
+    )
+
+
+def _stubs(node: Any, spec: Dict, expanded: set, out: List[Tuple]) -> None:
+    """
+    Walk node along spec and collect (container, key, url, subspec) for each
+    unexpanded $ref stub we reach.
+    """
+    stack = [(node, spec)]
+    while stack:
+        cur, sp = stack.pop()
+        if not sp:
+            continue
+        for field, sub in sp.items():
+            if field == "*":
+                if isinstance(cur, list):
+                    children = list(enumerate(cur))
+                elif isinstance(cur, dict):
+                    children = list(cur.items())
+                else:
+                    continue
+            elif isinstance(cur, dict) and field in cur:
+                children = [(field, cur[field])]
+            else:
+                continue
+
+            for key, child in children:
+                if (
+                    isinstance(child, dict)
+                    and child.get("$ref")
+                    and id(child) not in expanded
+                ):
+                    out.append((cur, key, child["$ref"], sub))
+                else:
+                    stack.append((child, sub))
+
+
+def resolve_many(
+    urls: Iterable[str],
+    spec: Dict | None = None,
+    max_depth: int | None = None,
+    headers: Dict | None = None,
+    resource: str = "default",
+    label: str = "refs",
+    stale_before: float | None = None,
+) -> Dict[str, Any]:
+    """
+    Resolve several roots with one breadth-first walk.
+
+    Returns {url: materialised document or None}. Stubs whose fetch fails
+    are left in place; max_depth caps the number of $ref hops below a root.
+    Disk cache entries stored before stale_before are revalidated.
+    """
+    urls = list(urls)
+    docs: Dict[str, Any] = {}
+    expanded: set = set()
+
+    def fetch(url: str):
+        try:
+            doc = get_json(url, headers=headers, resource=resource, stale_before=stale_before)
+        except Exception as e:
+            print(f"[{label}] GET failed {url}: {e}")
+            return None
+        # Private copy: we splice children into it and the cached original
+        # must stay untouched.
+        doc = copy.deepcopy(doc)
+        if isinstance(doc, dict):
+            expanded.add(id(doc))
+        return doc
+
+    def fetch_all(wanted: Iterable[str]) -> None:
+        missing = [u for u in dict.fromkeys(wanted) if u not in docs]
+        docs.update(map_teams(fetch, missing, label=label))
+
+    roots = {u: canonical(u) for u in urls}
+    fetch_all(roots.values())
+
+    frontier = [(docs.get(c), spec or {}) for c in roots.values()]
+    depth = 0
+    while frontier and (max_depth is None or depth < max_depth):
+        found: List[Tuple] = []
+        for node, sp in frontier:
+            if node is not None:
+                _stubs(node, sp, expanded, found)
+        if not found:
+            break
+
+        fetch_all(canonical(ref) for _, _, ref, _ in found)
+
+        frontier = []
+        for container, key, ref, sub in found:
+            doc = docs.get(canonical(ref))
+            if doc is None:
+                continue
+            container[key] = doc
+            frontier.append((doc, sub))
+        depth += 1
+
+    return {u: docs.get(c) for u, c in roots.items()}
+
+
+def resolve(
+    url: str,
+    spec: Dict | None = None,
+    max_depth: int | None = None,
+    headers: Dict | None = None,
+    resource: str = "default",
+    label: str = "refs",
+    stale_before: float | None = None,
+) -> Any:
+    """Resolve one root; see resolve_many. Returns None if the root fails."""
+    return resolve_many(
+        [url], spec, max_depth=max_depth, headers=headers, resource=resource, label=label,
+        stale_before=stale_before,
+    )[url]
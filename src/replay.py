@@ -0,0 +1,140 @@
+# src/replay.py
+
+"""
+Record / replay of every HTTP exchange in a run.
+
+    python -m src.main --date 2025-11-02 --record runs/2025-11-02
+    python -m src.main --date 2025-11-02 --replay runs/2025-11-02
+
+ARCHIVE hooks into http._get, which every live request already goes
+through (get_json, the PFR session, ESPN pages).
+
+- record: each response (status, reason, headers, body bytes) is kept under
+  its request key (URL + sorted params, always the real host). At the end
+  of the run it is written to <dir>/http_archive.zip: an index.json plus
+  one deflated member per distinct body, so repeated bodies are stored once.
+- replay: the archive is loaded up front and responses are served back byte
+  for byte with no network. A key requested more than once (retries)
+  replays its responses in recorded order, the last one repeating; a key
+  that was never recorded fails like a connection error.
+
+Both modes run with the disk cache and local stores off, so the recording
+holds every request the run needs and the replay asks for the same ones.
+"""
+
+import hashlib
+import json
+import threading
+import zipfile
+from pathlib import Path
+from typing import Dict, List
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .utils import atomic_path
+
+ARCHIVE_NAME = "http_archive.zip"
+INDEX_NAME = "index.json"
+
+
+class HttpArchive:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.mode: str | None = None   # None, "record" or "replay"
+        self.path: Path | None = None
+        self._exchanges: Dict[str, List[dict]] = {}
+        self._bodies: Dict[str, bytes] = {}
+        self._served: Dict[str, int] = {}
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def record(self, directory: str | Path) -> "HttpArchive":
+        """Start capturing; close() writes the archive into directory."""
+        with self._lock:
+            self.mode = "record"
+            self.path = Path(directory) / ARCHIVE_NAME
+            self._exchanges, self._bodies, self._served = {}, {}, {}
+        return self
+
+    def replay(self, directory: str | Path) -> "HttpArchive":
+        """Load directory's archive and serve every request from it."""
+        path = Path(directory) / ARCHIVE_NAME
+        with zipfile.ZipFile(path) as zf:
+            exchanges = json.loads(zf.read(INDEX_NAME))
+            bodies = {
+                name.split("/", 1)[1]: zf.read(name)
+                for name in zf.namelist()
+                if name.startswith("bodies/")
+            }
+        with self._lock:
+            self.mode = "replay"
+            self.path = path
+            self._exchanges, self._bodies, self._served = exchanges, bodies, {}
+        print(f"[replay] serving {sum(map(len, exchanges.values()))} responses from {path}")
+        return self
+
+    def add(self, key: str, resp: requests.Response) -> None:
+        """Keep one live response under its request key (record mode)."""
+        body = resp.content or b""
+        digest = hashlib.sha1(body).hexdigest()
+        entry = {
+            "status": resp.status_code,
+            "reason": resp.reason,
+            "url": resp.url,
+            "headers": dict(resp.headers),
+            "body": digest,
+        }
+        with self._lock:
+            self._bodies.setdefault(digest, body)
+            self._exchanges.setdefault(key, []).append(entry)
+
+    def serve(self, key: str) -> requests.Response:
+        """The next recorded response for key (replay mode)."""
+        with self._lock:
+            recorded = self._exchanges.get(key)
+            if not recorded:
+                raise requests.ConnectionError(f"[replay] no recorded response for {key}")
+            n = self._served.get(key, 0)
+            self._served[key] = n + 1
+            entry = recorded[min(n, len(recorded) - 1)]
+            body = self._bodies[entry["body"]]
+
+        resp = requests.Response()
+        resp.status_code = entry["status"]
+        resp.reason = entry.get("reason")
+        resp.url = entry.get("url") or key
+        resp.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp._content = body
+        return resp
+
+    def close(self) -> Path | None:
+        """Leave record/replay mode; when recording, write the archive and return its path."""
+        with self._lock:
+            mode, path = self.mode, self.path
+            exchanges, bodies = self._exchanges, self._bodies
+            self.mode, self.path = None, None
+            self._exchanges, self._bodies, self._served = {}, {}, {}
+        if mode != "record" or path is None:
+            return None
+
+        with atomic_path(path) as tmp, zipfile.ZipFile(
+            tmp, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9
+        ) as zf:
+            zf.writestr(INDEX_NAME, json.dumps(exchanges, sort_keys=True, separators=(",", ":")))
+            for digest, body in sorted(bodies.items()):
+                zf.writestr(f"bodies/{digest}", body)
+        count = sum(map(len, exchanges.values()))
+        print(f"[replay] recorded {count} responses ({len(bodies)} distinct bodies) → {path}")
+        return path
+
+
+ARCHIVE = HttpArchive()
@@ -0,0 +1,175 @@
+# src/runstats.py
+
+"""
+Run instrumentation.
+
+RUN_STATS collects, for one run:
+- stages:  wall and CPU seconds plus call count per pipeline stage
+           (schedule, team_stats, derived, starters, pfr, output, ...),
+           recorded with the @timed("name") decorator or `with RUN_STATS.stage(...)`
+- hosts:   request count, bytes, errors and latency percentiles per host,
+           recorded by http.py around every live request
+- caches:  run cache / disk cache hit rates, read at report time
+
+main.run() resets it at the start of a run and at the end writes
+run_report.json next to latest.csv and prints a short summary.
+
+CPU time is process-wide (time.process_time), so stages running on the
+thread pool at the same time each see the others' CPU too.
+"""
+
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+from urllib.parse import urlsplit
+
+from .utils import atomic_write
+
+REPORT_FILENAME = "run_report.json"
+
+
+def _percentile(values: List[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class RunStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self._t0 = time.perf_counter()
+            self._cpu0 = time.process_time()
+            self.stages: Dict[str, Dict[str, float]] = {}
+            self.hosts: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            with self._lock:
+                s = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+                s["calls"] += 1
+                s["wall_s"] += wall
+                s["cpu_s"] += cpu
+
+    def request(self, url: str, seconds: float, nbytes: int = 0,
+                status: int | None = None, error: bool = False) -> None:
+        """Record one live HTTP request (a 4xx/5xx status counts as an error)."""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            h = self.hosts.setdefault(
+                host, {"requests": 0, "bytes": 0, "errors": 0, "statuses": {}, "latencies": []}
+            )
+            h["requests"] += 1
+            h["bytes"] += nbytes
+            h["latencies"].append(seconds)
+            if status is not None:
+                h["statuses"][str(status)] = h["statuses"].get(str(status), 0) + 1
+            if error or (status is not None and status >= 400):
+                h["errors"] += 1
+
+    def report(self) -> Dict[str, Any]:
+        from .cache import DISK_CACHE, RUN_CACHE
+
+        with self._lock:
+            stages = {
+                name: {k: (round(v, 4) if isinstance(v, float) else v) for k, v in s.items()}
+                for name, s in self.stages.items()
+            }
+            hosts = {}
+            for host, h in self.hosts.items():
+                lat = h["latencies"]
+                hosts[host] = {
+                    "requests": h["requests"],
+                    "bytes": h["bytes"],
+                    "errors": h["errors"],
+                    "statuses": dict(h["statuses"]),
+                    "latency_s": {
+                        f"p{p}": (round(_percentile(lat, p), 4) if lat else None)
+                        for p in (50, 90, 99)
+                    },
+                }
+
+        lookups = RUN_CACHE.hits + RUN_CACHE.misses
+        served = DISK_CACHE.hits + DISK_CACHE.revalidated
+        disk_total = served + DISK_CACHE.misses
+        return {
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "wall_s": round(time.perf_counter() - self._t0, 4),
+            "cpu_s": round(time.process_time() - self._cpu0, 4),
+            "stages": stages,
+            "hosts": hosts,
+            "cache": {
+                "run": {
+                    "hits": RUN_CACHE.hits,
+                    "misses": RUN_CACHE.misses,
+                    "hit_rate": round(RUN_CACHE.hits / lookups, 4) if lookups else None,
+                },
+                "disk": {
+                    "enabled": DISK_CACHE.enabled,
+                    "fresh": DISK_CACHE.hits,
+                    "revalidated": DISK_CACHE.revalidated,
+                    "downloaded": DISK_CACHE.misses,
+                    "hit_rate": round(served / disk_total, 4) if disk_total else None,
+                },
+            },
+        }
+
+    def write_report(self, output_dir: str, extra: Dict[str, Any] | None = None) -> Path:
+        """Write the report as JSON into output_dir (next to latest.csv)."""
+        report = {**self.report(), **(extra or {})}
+        path = Path(output_dir) / REPORT_FILENAME
+        atomic_write(path, json.dumps(report, indent=2, sort_keys=True).encode("utf-8"))
+        return path
+
+    def summary(self) -> List[str]:
+        """Short human-readable lines for stdout."""
+        r = self.report()
+        lines = [f"[runstats] run {r['wall_s']:.2f}s wall, {r['cpu_s']:.2f}s cpu"]
+        for name, s in sorted(r["stages"].items(), key=lambda kv: -kv[1]["wall_s"]):
+            lines.append(
+                f"[runstats]   {name:<12} {s['wall_s']:7.2f}s wall {s['cpu_s']:7.2f}s cpu"
+                f"  x{s['calls']}"
+            )
+        for host, h in sorted(r["hosts"].items()):
+            p50, p90 = h["latency_s"]["p50"], h["latency_s"]["p90"]
+            lines.append(
+                f"[runstats]   {host}: {h['requests']} req, {h['bytes'] / 1024:.0f} KiB, "
+                f"{h['errors']} errors, p50 {p50 or 0:.3f}s p90 {p90 or 0:.3f}s"
+            )
+        run, disk = r["cache"]["run"], r["cache"]["disk"]
+        lines.append(
+            f"[runstats]   cache hit rate: run {run['hit_rate'] or 0:.0%}, "
+            f"disk {disk['hit_rate'] or 0:.0%}"
+        )
+        return lines
+
+
+RUN_STATS = RunStats()
+
+
+def timed(name: str):
+    """Decorator: record every call of the function as stage `name`."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with RUN_STATS.stage(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
@@ -1,19 +1,44 @@
 # src/schedule.py
 
-from datetime import datetime
-import requests
+"""
+NFL schedule / scoreboard access.
+
+SCHEDULE is a local season schedule index (<cache_dir>/schedule.json): every
+event of a season, slimmed down to the fields we use, keyed by ET kickoff
+date. A season is pulled with one bulk scoreboard request the first time
+it is needed. After that only games that have kicked off but aren't final
+yet are re-fetched, plus a daily re-check of the season's remaining
+unplayed dates for reschedules. get_matchups and last_final_by_team are
+lookups against it. Fully final seasons are never
+fetched again.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from dateutil.parser import isoparse
+
+from .http import get_json
+from .runstats import timed
+from .store import JsonStore
+from .utils import ZoneInfo
 
 SCOREBOARD_URL = "https://site.api.espn.com/apis/site/v2/sports/football/nfl/scoreboard"
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/123.0.0.0 Safari/537.36"
-    ),
-    "Accept": "application/json, text/plain, */*",
-    "Accept-Language": "en-US,en;q=0.9",
-    "Connection": "keep-alive",
-}
+
+# How far back last_final_by_team looks for completed games, and how long
+# after kickoff we assume a game (and its stat updates) is done.
+FINAL_LOOKBACK_DAYS = 14
+GAME_FINAL_GRACE = timedelta(hours=5)
+
+# A regular season + playoffs fits between these (month, day) bounds
+SEASON_START = (9, 1)
+SEASON_END = (2, 15)
+
+# Unplayed dates of an indexed season are re-checked this often (flexed or
+# rescheduled games); kicked-off games are re-fetched until final.
+INDEX_RECHECK_SECONDS = 24 * 3600
+INDEX_TZ = "America/New_York"
 
 
 def _parse_date(target_date: str | None) -> str:
@@ -28,32 +53,18 @@ def _parse_date(target_date: str | None) -> str:
     return dt.strftime("%Y%m%d")
 
 
-def get_matchups(target_date: str | None = None):
-    """
-    Return list of (game_id, team, opponent, home_away)
-    for all scheduled NFL games on target_date.
+def season_range(season: int) -> tuple[str, str]:
+    """(first, last) YYYY-MM-DD dates that can hold games of `season`."""
+    first = datetime(season, *SEASON_START).strftime("%Y-%m-%d")
+    last = datetime(season + 1, *SEASON_END).strftime("%Y-%m-%d")
+    return first, last
 
-    - team/opponent are ESPN abbreviations (DAL, PHI, etc.)
-    - home_away is 'H' for the listed team if home, 'A' if away.
-    """
-    datestr = _parse_date(target_date)
-
-    try:
-        resp = requests.get(
-            SCOREBOARD_URL,
-            params={"dates": datestr},
-            headers=HEADERS,
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-    except Exception as e:
-        print(f"[schedule] failed to fetch scoreboard for {datestr}: {e}")
-        return []
 
+def _matchups_from_events(events: list) -> list:
+    """(game_id, team, opponent, home_away) rows for scoreboard events."""
     matchups = []
 
-    for ev in data.get("events", []):
+    for ev in events:
         gid = ev.get("id", "")
         comps = ev.get("competitions") or []
         if not comps:
@@ -78,5 +89,251 @@ def get_matchups(target_date: str | None = None):
         matchups.append((gid, home_team, away_team, "H"))
         matchups.append((gid, away_team, home_team, "A"))
 
+    return matchups
+
+
+def events_by_date(events: list, tz_name: str = "America/New_York") -> dict:
+    """
+    Group scoreboard events by local kickoff date (YYYY-MM-DD in tz_name),
+    the same day get_matchups would list them under. Keys are sorted.
+    """
+    tz = ZoneInfo(tz_name)
+    by_date: dict[str, list] = {}
+    for ev in events:
+        try:
+            day = isoparse(ev["date"]).astimezone(tz).date().isoformat()
+        except (KeyError, ValueError):
+            continue
+        by_date.setdefault(day, []).append(ev)
+    return dict(sorted(by_date.items()))
+
+
+def _fetch_events(start: str, end: str) -> list:
+    """Raw scoreboard events from start to end (YYYY-MM-DD); raises on failure."""
+    dates = f"{_parse_date(start)}-{_parse_date(end)}" if end != start else _parse_date(start)
+    data = get_json(
+        SCOREBOARD_URL,
+        params={"dates": dates, "limit": 1000},
+        resource="schedule",
+    )
+    return data.get("events", [])
+
+
+def get_scoreboard_events(start: str, end: str | None = None) -> list:
+    """
+    Raw scoreboard events from start to end (YYYY-MM-DD, inclusive) in one
+    request. Returns [] if the scoreboard can't be fetched.
+    """
+    try:
+        return _fetch_events(start, end or start)
+    except Exception as e:
+        print(f"[schedule] failed to fetch scoreboard for {start}..{end or start}: {e}")
+        return []
+
+
+def _slim(ev: dict) -> dict:
+    """The parts of a scoreboard event the pipeline reads."""
+    comp = (ev.get("competitions") or [{}])[0]
+    status = ev.get("status") or comp.get("status") or {}
+    return {
+        "id": ev.get("id"),
+        "date": ev.get("date"),
+        "season": ev.get("season"),
+        "status": {"type": {
+            "completed": bool((status.get("type") or {}).get("completed")),
+            "state": (status.get("type") or {}).get("state"),
+        }},
+        "competitions": [{
+            "competitors": [
+                {
+                    "homeAway": c.get("homeAway"),
+                    "team": {"abbreviation": (c.get("team") or {}).get("abbreviation")},
+                    "score": c.get("score"),
+                    "linescores": [{"value": p.get("value")} for p in c.get("linescores") or []],
+                }
+                for c in comp.get("competitors") or []
+            ],
+        }],
+    }
+
+
+def _season_of(day: str) -> int:
+    """Season a YYYY-MM-DD date belongs to (Jan/Feb count as last year's)."""
+    dt = datetime.strptime(day, "%Y-%m-%d")
+    return dt.year - 1 if dt.month <= SEASON_END[0] else dt.year
+
+
+class ScheduleIndex:
+    """
+    Season schedule index backed by a JsonStore:
+      "date/<YYYY-MM-DD>" -> [slim events kicking off that ET date]
+      "season/<year>"     -> {"fetched_at": epoch of the last full re-check}
+    With no path it lives in memory for the run (--no-cache).
+    """
+
+    def __init__(self):
+        self.store = JsonStore()
+        self._lock = threading.RLock()
+
+    def open(self, path) -> "ScheduleIndex":
+        with self._lock:
+            self.store.open(path)
+        return self
+
+    def clear(self) -> None:
+        with self._lock:
+            self.store.clear()
+
+    def _merge(self, start: str, end: str, events: list) -> None:
+        """Replace what we hold for dates start..end with a fresh fetch."""
+        for key, _ in self.store.items():
+            if key.startswith("date/") and start <= key[5:] <= end:
+                self.store.set(key, [])
+        for day, evs in events_by_date(events, INDEX_TZ).items():
+            self.store.set(f"date/{day}", [_slim(ev) for ev in evs])
+
+    def _pending(self, season: int) -> list:
+        """
+        Dates holding kicked-off games of `season` that aren't final yet
+        (postponed/canceled ones, already in the "post" state, don't count).
+        """
+        first, last = season_range(season)
+        now = time.time()
+        days = []
+        for key, evs in self.store.items():
+            day = key[5:]
+            if not key.startswith("date/") or not first <= day <= last:
+                continue
+            for ev in evs:
+                try:
+                    started = isoparse(ev["date"]).timestamp() <= now
+                except (KeyError, ValueError):
+                    continue
+                state = ev["status"]["type"].get("state")
+                if started and not _is_final(ev) and state != "post":
+                    days.append(day)
+                    break
+        return sorted(days)
+
+    def ensure(self, target_date: str | None = None) -> bool:
+        """
+        Make sure the season containing target_date is indexed and its
+        in-progress games are current. Returns False if the season isn't
+        available (scoreboard unreachable and nothing stored).
+        """
+        day = datetime.strptime(_parse_date(target_date), "%Y%m%d").strftime("%Y-%m-%d")
+        season = _season_of(day)
+        first, last = season_range(season)
+        with self._lock:
+            meta = self.store.get(f"season/{season}")
+            try:
+                if not meta:
+                    self._merge(first, last, _fetch_events(first, last))
+                    self.store.set(f"season/{season}", {"fetched_at": time.time()})
+                else:
+                    pending = self._pending(season)
+                    if pending:
+                        self._merge(pending[0], pending[-1], _fetch_events(pending[0], pending[-1]))
+                    if time.time() - meta.get("fetched_at", 0) > INDEX_RECHECK_SECONDS:
+                        today = str(datetime.now(ZoneInfo(INDEX_TZ)).date())
+                        if today <= last:
+                            start = max(today, first)
+                            self._merge(start, last, _fetch_events(start, last))
+                        self.store.set(f"season/{season}", {"fetched_at": time.time()})
+            except Exception as e:
+                print(f"[schedule] failed to refresh schedule index for {season}: {e}")
+                if not meta:
+                    return False
+            self.store.save()
+        return True
+
+    def has_season(self, season: int) -> bool:
+        """Whether season is indexed already (never fetches)."""
+        return self.store.get(f"season/{season}") is not None
+
+    def events_on(self, day: str) -> list:
+        return list(self.store.get(f"date/{day}") or [])
+
+    def by_date(self, start: str, end: str) -> dict:
+        """{date: events} from start to end (YYYY-MM-DD, inclusive), sorted."""
+        return {
+            key[5:]: list(evs)
+            for key, evs in sorted(self.store.items())
+            if key.startswith("date/") and start <= key[5:] <= end and evs
+        }
+
+    def events_between(self, start: str, end: str) -> list:
+        """Events from start to end (YYYY-MM-DD, inclusive), in date order."""
+        return [ev for evs in self.by_date(start, end).values() for ev in evs]
+
+
+SCHEDULE = ScheduleIndex()
+
+
+@timed("schedule")
+def get_matchups(target_date: str | None = None):
+    """
+    Return list of (game_id, team, opponent, home_away)
+    for all scheduled NFL games on target_date.
+
+    - team/opponent are ESPN abbreviations (DAL, PHI, etc.)
+    - home_away is 'H' for the listed team if home, 'A' if away.
+
+    Answered from the SCHEDULE index (refreshed first if needed).
+    """
+    datestr = _parse_date(target_date)
+    day = datetime.strptime(datestr, "%Y%m%d").strftime("%Y-%m-%d")
+
+    if not SCHEDULE.ensure(day):
+        return []
+
+    matchups = _matchups_from_events(SCHEDULE.events_on(day))
     print(f"[schedule] {len(matchups)} rows for {datestr}")
     return matchups
+
+
+def _is_final(ev: dict) -> bool:
+    status = ev.get("status") or ((ev.get("competitions") or [{}])[0].get("status")) or {}
+    return bool((status.get("type") or {}).get("completed"))
+
+
+def lookback_start(target_date: str | None = None) -> float:
+    """Epoch seconds at the start of last_final_by_team's window."""
+    day = datetime.strptime(_parse_date(target_date), "%Y%m%d")
+    start = day - timedelta(days=FINAL_LOOKBACK_DAYS)
+    return start.replace(tzinfo=timezone.utc).timestamp()
+
+
+@timed("schedule")
+def last_final_by_team(target_date: str | None = None) -> dict | None:
+    """
+    Map team abbr -> epoch seconds when its most recent completed game (in
+    the FINAL_LOOKBACK_DAYS before target_date) can be considered final.
+
+    Teams that are missing had no completed game in the window, so nothing
+    about them changed after lookback_start(). Returns None when the
+    scoreboard is unavailable and callers should not assume anything.
+    """
+    end = datetime.strptime(_parse_date(target_date), "%Y%m%d")
+    start = end - timedelta(days=FINAL_LOOKBACK_DAYS)
+    start_day, end_day = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+    if not SCHEDULE.ensure(start_day) or not SCHEDULE.ensure(end_day):
+        return None
+    events = SCHEDULE.events_between(start_day, end_day)
+    if not events:
+        return None
+
+    finals: dict[str, float] = {}
+    for ev in events:
+        if not _is_final(ev):
+            continue
+        try:
+            done = (isoparse(ev["date"]) + GAME_FINAL_GRACE).timestamp()
+        except (KeyError, ValueError):
+            continue
+        for comp in (ev.get("competitions") or [])[:1]:
+            for c in comp.get("competitors") or []:
+                abbr = (c.get("team") or {}).get("abbreviation")
+                if abbr and done > finals.get(abbr, 0):
+                    finals[abbr] = done
+    return finals
@@ -1,19 +1,10 @@
-import requests
 from bs4 import BeautifulSoup
 
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/120.0.0.0 Safari/537.36"
-    )
-}
+from ..http import get_text
 
 def _get_soup(url: str):
     try:
-        r = requests.get(url, headers=HEADERS, timeout=12)
-        r.raise_for_status()
-        return BeautifulSoup(r.text, "lxml")
+        return BeautifulSoup(get_text(url), "lxml")
     except Exception as e:
         print(f"[espn] fetch error for {url}: {e}")
         return None
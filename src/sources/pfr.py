@@ -1,97 +1,239 @@
 # src/sources/pfr.py
+import gzip
+import re
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
 import pandas as pd
-from ..http import fetch
+from lxml import html as lxml_html
 
+from ..http import fetch
+from ..runstats import timed
+from ..schedule import (
+    GAME_FINAL_GRACE,
+    INDEX_TZ,
+    SCHEDULE,
+    _matchups_from_events,
+    last_final_by_team,
+    lookback_start,
+    season_range,
+)
+from ..store import JsonStore
+from ..team_stats import _season_and_type
+from ..utils import ZoneInfo, atomic_write
+
+# ESPN abbreviation -> PFR team slug
 TEAM_PFR = {
-    "DAL": "dal",
+    "ARI": "crd", "ATL": "atl", "BAL": "rav", "BUF": "buf",
+    "CAR": "car", "CHI": "chi", "CIN": "cin", "CLE": "cle",
+    "DAL": "dal", "DEN": "den", "DET": "det", "GB": "gnb",
+    "HOU": "htx", "IND": "clt", "JAX": "jax", "KC": "kan",
+    "LAC": "sdg", "LAR": "ram", "LV": "rai", "MIA": "mia",
+    "MIN": "min", "NE": "nwe", "NO": "nor", "NYG": "nyg",
+    "NYJ": "nyj", "PHI": "phi", "PIT": "pit", "SEA": "sea",
+    "SF": "sfo", "TB": "tam", "TEN": "oti", "WSH": "was",
+    # PFR (and older code here) spell Washington WAS; ESPN uses WSH
     "WAS": "was",
-    # add all teams as you go (BUF: 'buf', KC: 'kan', etc.)
 }
+ESPN_ABBR = {"WAS": "WSH"}
 
-def _read_html_tables(url: str):
-    # Some PFR tables are inside HTML comments; pandas handles many cases.
-    resp = fetch(url)
-    html = resp.text
-    # Try normal read first
-    try:
-        return pd.read_html(html, flavor="lxml")
-    except ValueError:
-        # Fallback: strip HTML comments that sometimes wrap tables
-        import re
-        uncommented = re.sub(r"<!--|-->", "", html)
-        return pd.read_html(uncommented, flavor="lxml")
+# Team season pages list every game in <table id="games">; PFR sometimes
+# ships it inside an HTML comment, which the raw-text search below also finds.
+GAMES_TABLE_ID = "games"
 
-def team_game_log_year(team_code: str, season: int):
+# data-stat columns kept as text; every other column is parsed as a number
+TEXT_STATS = {
+    "week_num", "game_day_of_week", "gametime", "boxscore_word",
+    "game_outcome", "overtime", "rec", "game_location", "opp",
+}
+
+
+def _table_markup(page: str, table_id: str) -> str | None:
+    """Raw <table id=...>...</table> text from the page (commented or not)."""
+    m = re.search(r'<table\b[^>]*\bid="%s"' % re.escape(table_id), page)
+    if not m:
+        return None
+    end = page.find("</table>", m.end())
+    if end < 0:
+        return None
+    return page[m.start():end + len("</table>")]
+
+
+def _read_table(page: str, table_id: str) -> pd.DataFrame:
     """
-    Returns (raw_df, agg_dict) for a team's season schedule & game results.
-    Computes per-game means for the metrics we need.
+    Build one PFR table as a DataFrame with a column per data-stat.
+
+    Only that table's markup is parsed (one lxml pass). Repeated header rows
+    are skipped, game_date comes from its csk attribute (YYYY-MM-DD) as a
+    datetime, TEXT_STATS stay strings and everything else is numeric.
     """
-    slug = TEAM_PFR[team_code]
-    url = f"https://www.pro-football-reference.com/teams/{slug}/{season}.htm"
-    tables = _read_html_tables(url)
-
-    # Heuristic: pick the largest table that contains 'Date' and 'Pts'
-    candidate = None
-    for t in tables:
-        if "Date" in t.columns and "Pts" in t.columns:
-            candidate = t if candidate is None or t.shape[0] > candidate.shape[0] else candidate
-    if candidate is None:
-        return pd.DataFrame(), {}
+    markup = _table_markup(page, table_id)
+    if markup is None:
+        return pd.DataFrame()
+
+    table = lxml_html.fragment_fromstring(markup)
+    rows = []
+    for tr in table.iterfind(".//tbody/tr"):
+        if "thead" in (tr.get("class") or ""):
+            continue
+        row = {}
+        for cell in tr:
+            stat = cell.get("data-stat")
+            if stat:
+                row[stat] = cell.get("csk") if stat == "game_date" else cell.text_content()
+        if row:
+            rows.append(row)
+
+    df = pd.DataFrame(rows)
+    for col in df.columns:
+        if col == "game_date":
+            df[col] = pd.to_datetime(df[col], format="%Y-%m-%d", errors="coerce")
+        elif col in TEXT_STATS:
+            df[col] = df[col].fillna("").str.strip()
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+class PageCache:
+    """
+    Gzipped PFR team pages on disk, keyed by (slug, season), plus a JsonStore
+    index recording when each was fetched and the last game it contains.
+    With no root nothing is kept (--no-cache runs).
+    """
+
+    def __init__(self):
+        self.root: Path | None = None
+        self.index = JsonStore()
+
+    def open(self, root: str | Path | None) -> "PageCache":
+        self.root = Path(root) if root else None
+        self.index.open(self.root / "index.json" if self.root else None)
+        return self
 
-    df = candidate.copy()
+    def clear(self) -> None:
+        self.index.clear()
 
-    # Keep rows that look like real games (PFR often formats as YYYY-MM-DD)
-    mask = df["Date"].astype(str).str.match(r"\d{4}-\d{2}-\d{2}", na=False)
-    df = df[mask].reset_index(drop=True)
+    def _path(self, slug: str, season: int) -> Path:
+        return self.root / f"{slug}_{season}.html.gz"
 
-    # H/A column: on many pages away has '@' in an unnamed column
-    if "Unnamed: 5" in df.columns:
-        df["H/A"] = df["Unnamed: 5"].fillna("").map(lambda x: "A" if str(x).strip()=="@" else "H")
-    elif "H/A" not in df.columns:
-        df["H/A"] = "H"
+    def get(self, slug: str, season: int):
+        """(index entry, page text) or (None, None) if we don't have it."""
+        entry = self.index.get(f"{slug}/{season}")
+        if not self.root or not entry:
+            return None, None
+        try:
+            return entry, gzip.decompress(self._path(slug, season).read_bytes()).decode("utf-8")
+        except (OSError, EOFError, UnicodeDecodeError):
+            return None, None
 
-    # Normalize numeric cols helper
-    def num(series_name, default=None):
-        if series_name not in df.columns:
-            return default
-        return pd.to_numeric(df[series_name], errors="coerce")
+    def put(self, slug: str, season: int, text: str, last_game: str | None) -> None:
+        if not self.root:
+            return
+        atomic_write(self._path(slug, season), gzip.compress(text.encode("utf-8"), mtime=0))
+        self.index.set(f"{slug}/{season}", {"fetched_at": time.time(), "last_game": last_game})
+        self.index.save()
+
+
+PFR_PAGES = PageCache()
+
+
+def _page_is_current(team_code: str, season: int, entry: dict) -> bool:
+    """
+    Whether a cached page still has every game the team has played: a past
+    season's page is final once it holds the whole season (see
+    _has_whole_season); otherwise the team's latest final (per the
+    scoreboard) must not be newer than the page's last game.
+    """
+    if season < _season_and_type()[0]:
+        return _has_whole_season(team_code, season, entry)
+
+    finals = last_final_by_team()
+    if finals is None:
+        return False
+    done = finals.get(ESPN_ABBR.get(team_code, team_code))
+    if not done:
+        # No final in the lookback window: current if fetched since it opened
+        return entry.get("fetched_at", 0) >= lookback_start()
+
+    kickoff = done - GAME_FINAL_GRACE.total_seconds()
+    played = datetime.fromtimestamp(kickoff, ZoneInfo("America/New_York")).date().isoformat()
+    return (entry.get("last_game") or "") >= played
+
+
+def _has_whole_season(team_code: str, season: int, entry: dict) -> bool:
+    """
+    Whether a past season's page can't change any more: it was fetched
+    after the season window closed, or its last game is the team's last
+    game of the season in the schedule index (only consulted if that
+    season is already indexed, so this never fetches). A page stored
+    mid-season fails both and is fetched once more.
+    """
+    first, last = season_range(season)
+    closed = datetime.strptime(last, "%Y-%m-%d").replace(tzinfo=ZoneInfo(INDEX_TZ))
+    if entry.get("fetched_at", 0) >= (closed + timedelta(days=1)).timestamp():
+        return True
+    if not entry.get("last_game") or not SCHEDULE.has_season(season):
+        return False
+
+    team = ESPN_ABBR.get(team_code, team_code)
+    days = [
+        day
+        for day, events in SCHEDULE.by_date(first, last).items()
+        if any(t == team for (_, t, _, _) in _matchups_from_events(events))
+    ]
+    return bool(days) and entry["last_game"] >= days[-1]
+
+
+def _last_game(df: pd.DataFrame) -> str | None:
+    """Date (YYYY-MM-DD) of the last game on the page that has a score."""
+    if "pts_off" not in df.columns:
+        return None
+    played = df.loc[df["pts_off"].notna(), "game_date"].dropna()
+    return played.max().strftime("%Y-%m-%d") if len(played) else None
+
+
+@timed("pfr")
+def team_game_log_year(team_code: str, season: int):
+    """
+    Returns (raw_df, agg_dict) for a team's season schedule & game results.
+    Computes home/road points per game (pts_pg_home, pts_pg_road).
+
+    The page comes from PFR_PAGES unless the team has played since it was
+    stored; fresh downloads are stored back.
+    """
+    slug = TEAM_PFR[team_code]
+    entry, page = PFR_PAGES.get(slug, season)
+    if page is not None and _page_is_current(team_code, season, entry):
+        df = _read_table(page, GAMES_TABLE_ID)
+    else:
+        url = f"https://www.pro-football-reference.com/teams/{slug}/{season}.htm"
+        page = fetch(url).text
+        df = _read_table(page, GAMES_TABLE_ID)
+        PFR_PAGES.put(slug, season, page, _last_game(df) if "game_date" in df.columns else None)
+    if df.empty or "game_date" not in df.columns:
+        return pd.DataFrame(), {}
 
-    # Quarter points: column names vary (try both variants)
-    q1 = "1st" if "1st" in df.columns else ("1stQ" if "1stQ" in df.columns else None)
-    q4 = "4th" if "4th" in df.columns else ("4thQ" if "4thQ" in df.columns else None)
+    # Keep rows that are real games (bye weeks / future games have no date)
+    df = df[df["game_date"].notna()].reset_index(drop=True)
 
-    # Attempts/completions
-    cmp_c = "Cmp" if "Cmp" in df.columns else ("Cmp.1" if "Cmp.1" in df.columns else None)
-    att_c = "Att" if "Att" in df.columns else ("Att.1" if "Att.1" in df.columns else None)
-    rush_att = "Rush Att" if "Rush Att" in df.columns else ("Att.2" if "Att.2" in df.columns else None)
+    # game_location is '@' for road games
+    location = df["game_location"] if "game_location" in df.columns else ""
+    df["H/A"] = pd.Series(location, index=df.index).map(lambda x: "A" if x == "@" else "H")
 
     out = {}
     n = len(df)
     if n == 0:
         return df, out
 
-    # Offense by quarter
-    if q1: out["off_1q_pts_pg"] = num(q1).mean()
-    if q4: out["off_4q_pts_pg"] = num(q4).mean()
-
-    # Allowed by quarter (if present as opponent columns; many pages don’t expose — we can add boxscore fetch later)
-    opp_q1 = "Opp 1st" if "Opp 1st" in df.columns else ("Opp1" if "Opp1" in df.columns else None)
-    opp_q4 = "Opp 4th" if "Opp 4th" in df.columns else ("Opp4" if "Opp4" in df.columns else None)
-    if opp_q1: out["def_1q_pts_allowed_pg"] = num(opp_q1).mean()
-    if opp_q4: out["def_4q_pts_allowed_pg"] = num(opp_q4).mean()
-
-    # Passing & rushing volume
-    if rush_att: out["rush_att_pg"] = num(rush_att).mean()
-    if att_c: out["pass_att_pg"] = num(att_c).mean()
-    if cmp_c:
-        comp = num(cmp_c)
-        out["pass_comp_pg"] = comp.mean()
-        if "pass_att_pg" in out and out["pass_att_pg"]:
-            out["pass_comp_pct"] = (out["pass_comp_pg"] / out["pass_att_pg"]) * 100
+    # Quarter splits and per-game attempts/completions aren't on the season
+    # page's games table (they'd need boxscores or the team game log page);
+    # it only has scores, so home/road PPG is all we aggregate here.
 
     # Home/Road PPG
-    if "Pts" in df.columns:
-        pts = num("Pts")
+    if "pts_off" in df.columns:
+        pts = df["pts_off"]
         out["pts_pg_home"] = pts[df["H/A"]=="H"].mean()
         out["pts_pg_road"] = pts[df["H/A"]=="A"].mean()
 
@@ -1,28 +1,110 @@
-﻿import requests
-from .team_stats import TEAM_IDS, _season_and_type
-
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/123.0.0.0 Safari/537.36"
-    ),
-    "Accept": "application/json, text/plain, */*",
-    "Accept-Language": "en-US,en;q=0.9",
-    "Connection": "keep-alive",
-}
+﻿import time
+
+from .cache import DISK_CACHE, RUN_CACHE
+from .extract import StatExtractor
+from .runstats import timed
+from .pool import map_teams
+from .refs import canonical, resolve, resolve_many
+from .schedule import last_final_by_team, lookback_start
+from .store import JsonStore
+from .team_stats import TEAM_IDS, _season_and_type, select_teams
 
 BASE = "https://sports.core.api.espn.com/v2/sports/football/leagues/nfl"
 
+# Expand each depth chart item; athlete stubs stay as refs.
+DEPTH_CHART_SPEC = {"items": {"*": {}}}
+
+# The only athlete stats _starters_for reads
+ATHLETE_STAT_FIELDS = StatExtractor(
+    [("passingYards", "passYards"), ("rushingYards", "rushYards"), "receivingYards", "fieldGoalPct"]
+)
+
+# get_starter_metrics field -> output column
+STARTER_COLUMNS = {
+    "RB_YDS": "NFL 1",
+    "QB_YDS": "NFL 2",
+    "K_FG_PCT": "NFL 3",
+    "WR_YDS": "NFL 4",
+}
+
+# Athlete season stats by statistics URL: {"fetched_at": epoch, "stats": {...}}.
+# main.run points it at <cache_dir>/athlete_stats.json.
+ATHLETE_STATS = JsonStore()
+
+
+def _athlete_refs(slots) -> list[str]:
+    refs = []
+    for s in slots or []:
+        # modern shape: s["athlete"]["$ref"]
+        a = s.get("athlete") or {}
+        aref = a.get("$ref")
+        if aref:
+            refs.append(aref)
+    return refs
+
+
+def _position_label(pos) -> str:
+    if isinstance(pos, dict):
+        pos = pos.get("abbreviation") or ""
+    return (pos or "").upper().strip()
+
+
+def _index_chart(chart: dict, index: list) -> None:
+    """Append (position label, ordered athlete refs) pairs for one chart."""
+    # Current ESPN shape: {"positions": {"qb": {"position": {...}, "athletes": [...]}}}
+    positions = chart.get("positions")
+    if isinstance(positions, dict):
+        for key, slot in positions.items():
+            label = _position_label(slot.get("position")) or key.upper()
+            athletes = sorted(
+                slot.get("athletes") or [],
+                key=lambda a: a.get("rank") or a.get("slot") or 0,
+            )
+            index.append((label, _athlete_refs(athletes)))
+        return
+
+    # Older flat shape: one chart per position with items/slots
+    label = _position_label(
+        chart.get("position") or chart.get("positionAbbreviation")
+    )
+    index.append((label, _athlete_refs(chart.get("items") or chart.get("slots"))))
+
+
+def _index_depth_chart(root: dict | None) -> list[tuple[str, list[str]]]:
+    if not root:
+        return []
+
+    index: list[tuple[str, list[str]]] = []
+    for chart in root.get("items") or []:
+        _index_chart(chart, index)
+    return index
+
+
+def _depth_chart_url(team_id: int) -> str:
+    return f"{BASE}/teams/{team_id}/depthcharts"
+
+
+def _depth_chart_index(team_id: int) -> list[tuple[str, list[str]]]:
+    """
+    Position -> ordered athlete refs for one team, in depth chart order.
+
+    The depth chart root and each of its items are fetched once per team per
+    run; every position lookup after that is answered from memory.
+    """
+    url = _depth_chart_url(team_id)
+    return RUN_CACHE.get(
+        ("depth_chart_index", url),
+        lambda: _index_depth_chart(_resolve_depth_charts([url])[url]),
+    )
+
 
-def _get_json(url: str):
-    try:
-        resp = requests.get(url, headers=HEADERS, timeout=15)
-        resp.raise_for_status()
-        return resp.json()
-    except Exception as e:
-        print(f"[starters] GET failed {url}: {e}")
-        return None
+def _resolve_depth_charts(urls: list[str]) -> dict:
+    return resolve_many(
+        urls,
+        DEPTH_CHART_SPEC,
+        resource="depth_chart",
+        label="starters",
+    )
 
 
 def _pick_depth_chart_starter(team_id: int, pos_abbr: str) -> str | None:
@@ -31,69 +113,97 @@ def _pick_depth_chart_starter(team_id: int, pos_abbr: str) -> str | None:
     Returns athlete API URL or None. Very defensive: if anything looks weird,
     we just return None and leave that field blank.
     """
-    url = f"{BASE}/teams/{team_id}/depthcharts"
-    root = _get_json(url)
-    if not root:
-        return None
-
-    items = root.get("items") or []
-    for item in items:
-        chart = item
-        ref = item.get("$ref") or item.get("href")
-        if ref:
-            tmp = _get_json(ref)
-            if tmp:
-                chart = tmp
-
-        label = (
-            (chart.get("position") or chart.get("positionAbbreviation") or "")
-            .upper()
-            .strip()
-        )
-        if pos_abbr not in label:
-            continue
-
-        slots = chart.get("items") or chart.get("slots") or []
-        for s in slots:
-            # modern shape: s["athlete"]["$ref"]
-            a = s.get("athlete") or {}
-            aref = a.get("$ref")
-            if aref:
-                return aref
-
+    for label, refs in _depth_chart_index(team_id):
+        if pos_abbr in label and refs:
+            return refs[0]
     return None
 
 
-def _collect_numeric_stats(obj, out: dict):
-    if isinstance(obj, dict):
-        name = obj.get("name")
-        val = obj.get("value")
-        if name and isinstance(val, (int, float)):
-            out[name] = val
-        for v in obj.values():
-            _collect_numeric_stats(v, out)
-    elif isinstance(obj, list):
-        for v in obj:
-            _collect_numeric_stats(v, out)
-
-
-def _get_player_stats(athlete_url: str, season: int, season_type: int) -> dict:
+def _get_player_stats(
+    athlete_url: str,
+    season: int,
+    season_type: int,
+    changed_at: float | None = None,
+) -> dict:
     """
     Fetch numeric season stats for a single player.
     If ESPN shape changes, returns {} and we fail gracefully.
+
+    changed_at is when the player's team last finished a game. A stored copy
+    fetched after that is still current, so we skip the request. With no
+    changed_at (schedule unknown) we always go to the network/disk cache.
+
+    A disk cache copy stored before changed_at is revalidated rather than
+    served, and fetched_at is the time the served copy was stored, so a
+    pre-final document is never recorded as current.
     """
     # Best-effort pattern; if it 404s we just bail for that player.
-    url = f"{athlete_url}/statistics/{season}/type/{season_type}"
-    data = _get_json(url)
+    url = f"{canonical(athlete_url)}/statistics/{season}/type/{season_type}"
+    entry = ATHLETE_STATS.get(url)
+    if entry and changed_at is not None and entry.get("fetched_at", 0) >= changed_at:
+        return entry.get("stats") or {}
+
+    started = time.time()
+    data = resolve(url, resource="athlete", label="starters", stale_before=changed_at)
     if not data:
         return {}
 
-    out: dict = {}
-    _collect_numeric_stats(data, out)
+    out = ATHLETE_STAT_FIELDS.extract(data)
+    fetched_at = DISK_CACHE.stored_at(url) or started
+    ATHLETE_STATS.set(url, {"fetched_at": fetched_at, "stats": out})
     return out
 
 
-def get_starter_metrics() -> dict[str, dict]:
+def _starters_for(
+    team_id: int,
+    season: int,
+    season_type: int,
+    changed_at: float | None = None,
+) -> dict:
+    """QB/RB/WR/K starter stats for one team; missing pieces are omitted."""
+    row: dict[str, float] = {}
+
+    # QB
+    qb_ref = _pick_depth_chart_starter(team_id, "QB")
+    if qb_ref:
+        s = _get_player_stats(qb_ref, season, season_type, changed_at)
+        yds = s.get("passingYards") or s.get("passYards")
+        if yds is not None:
+            row["QB_YDS"] = float(yds)
+
+    # RB
+    rb_ref = _pick_depth_chart_starter(team_id, "RB")
+    if rb_ref:
+        s = _get_player_stats(rb_ref, season, season_type, changed_at)
+        yds = s.get("rushingYards") or s.get("rushYards")
+        if yds is not None:
+            row["RB_YDS"] = float(yds)
+
+    # WR
+    wr_ref = _pick_depth_chart_starter(team_id, "WR")
+    if wr_ref:
+        s = _get_player_stats(wr_ref, season, season_type, changed_at)
+        yds = s.get("receivingYards")
+        if yds is not None:
+            row["WR_YDS"] = float(yds)
+
+    # K
+    k_ref = _pick_depth_chart_starter(team_id, "K")
+    if k_ref:
+        s = _get_player_stats(k_ref, season, season_type, changed_at)
+        pct = s.get("fieldGoalPct")
+        if pct is not None:
+            row["K_FG_PCT"] = round(float(pct), 2)
+
+    return row
+
+
+@timed("starters")
+def get_starter_metrics(
+    teams=None,
+    target_date: str | None = None,
+    season: int | None = None,
+) -> dict[str, dict]:
     """
     Returns dict keyed by team abbr:
 
@@ -108,47 +218,53 @@ def get_starter_metrics() -> dict[str, dict]:
     }
 
     Missing pieces are simply omitted → CSV cells stay blank.
+    `teams` limits the work to those abbreviations; None means all 32.
+    Teams run concurrently through pool.map_teams (TEAM_IDS order is kept).
+
+    Athlete stats are reused from ATHLETE_STATS unless the athlete's team has
+    finished a game (per the scoreboard around target_date) since they were
+    fetched.
     """
-    season, season_type = _season_and_type()
-    result: dict[str, dict] = {}
-
-    for abbr, team_id in TEAM_IDS.items():
-        row: dict[str, float] = {}
-
-        # QB
-        qb_ref = _pick_depth_chart_starter(team_id, "QB")
-        if qb_ref:
-            s = _get_player_stats(qb_ref, season, season_type)
-            yds = s.get("passingYards") or s.get("passYards")
-            if yds is not None:
-                row["QB_YDS"] = float(yds)
-
-        # RB
-        rb_ref = _pick_depth_chart_starter(team_id, "RB")
-        if rb_ref:
-            s = _get_player_stats(rb_ref, season, season_type)
-            yds = s.get("rushingYards") or s.get("rushYards")
-            if yds is not None:
-                row["RB_YDS"] = float(yds)
-
-        # WR
-        wr_ref = _pick_depth_chart_starter(team_id, "WR")
-        if wr_ref:
-            s = _get_player_stats(wr_ref, season, season_type)
-            yds = s.get("receivingYards")
-            if yds is not None:
-                row["WR_YDS"] = float(yds)
-
-        # K
-        k_ref = _pick_depth_chart_starter(team_id, "K")
-        if k_ref:
-            s = _get_player_stats(k_ref, season, season_type)
-            pct = s.get("fieldGoalPct")
-            if pct is not None:
-                row["K_FG_PCT"] = round(float(pct), 2)
-
-        if row:
-            result[abbr] = row
+    current, season_type = _season_and_type(target_date)
+    season = season or current
+
+    finals = last_final_by_team(target_date)
+    since = lookback_start(target_date)
+
+    def changed_at(abbr: str) -> float | None:
+        if finals is None:
+            return None
+        return finals.get(abbr, since)
+
+    abbrs = select_teams(teams)
+    # One breadth-first pass over every team's depth chart graph up front,
+    # so the per-team work below only reads the indexes from memory.
+    charts = _resolve_depth_charts([_depth_chart_url(TEAM_IDS[a]) for a in abbrs])
+    for url, root in charts.items():
+        RUN_CACHE.get(("depth_chart_index", url), lambda: _index_depth_chart(root))
+
+    per_team = map_teams(
+        lambda abbr: _starters_for(TEAM_IDS[abbr], season, season_type, changed_at(abbr)),
+        abbrs,
+        label="starters",
+    )
+    result = {abbr: row for abbr, row in per_team.items() if row}
+    ATHLETE_STATS.save()
 
     print(f"[starters] built starter metrics for {len(result)} teams")
     return result
+
+
+def get_starter_columns(
+    teams=None,
+    target_date: str | None = None,
+    season: int | None = None,
+) -> dict[str, dict]:
+    """
+    get_starter_metrics() as output columns: {"DAL": {"NFL 1": ..., "NFL 4": ...}}.
+    Missing pieces stay omitted, so those cells are left blank.
+    """
+    return {
+        abbr: {STARTER_COLUMNS[k]: v for k, v in row.items() if k in STARTER_COLUMNS}
+        for abbr, row in get_starter_metrics(teams, target_date, season).items()
+    }
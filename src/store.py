@@ -0,0 +1,73 @@
+# src/store.py
+
+"""
+Tiny persistent key/value store backed by one JSON file.
+
+Used for the small pieces of state we keep between runs (athlete stats,
+game results, ...). Reads come from memory; save() writes the whole file
+atomically and only when something changed. With no path the store is
+in-memory only, which is what --no-cache runs use.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+from .utils import atomic_write
+
+
+class JsonStore:
+    def __init__(self, path: str | Path | None = None):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = {}
+        self._dirty = False
+        self.path: Path | None = None
+        if path:
+            self.open(path)
+
+    def open(self, path: str | Path | None) -> "JsonStore":
+        """(Re)point the store at path and load whatever is there."""
+        with self._lock:
+            self.path = Path(path) if path else None
+            self._data = {}
+            self._dirty = False
+            if self.path and self.path.exists():
+                try:
+                    self._data = json.loads(self.path.read_text(encoding="utf-8"))
+                except (OSError, ValueError) as e:
+                    print(f"[store] ignoring unreadable {self.path}: {e}")
+        return self
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._dirty = True
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        with self._lock:
+            return iter(list(self._data.items()))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data = {}
+            self._dirty = True
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def save(self) -> None:
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            atomic_write(self.path, json.dumps(self._data, separators=(",", ":")).encode("utf-8"))
+            self._dirty = False
@@ -1,18 +1,14 @@
-﻿import requests
-from datetime import datetime
-from typing import Dict, Any, Optional
+﻿from datetime import datetime
+from typing import Dict, Any, Callable, Iterable, List
 
+import pandas as pd
+
+from .cache import RUN_CACHE
+from .extract import StatExtractor
+from .runstats import timed
+from .refs import resolve
+from .pool import map_teams
 
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/123.0.0.0 Safari/537.36"
-    ),
-    "Accept": "application/json, text/plain, */*",
-    "Accept-Language": "en-US,en;q=0.9",
-    "Connection": "keep-alive",
-}
 
 # ESPN team IDs by abbreviation (regular season)
 TEAM_IDS: Dict[str, int] = {
@@ -51,12 +47,15 @@ TEAM_IDS: Dict[str, int] = {
 }
 
 
-def _season_and_type() -> (int, int):
+def _season_and_type(day: str | None = None) -> (int, int):
     """
-    Decide which season + type to query.
-    For now: infer from current year; this is simple and safe enough.
+    Decide which season + type to query for a YYYY-MM-DD date (default:
+    today UTC). Infer from the calendar year; simple and safe enough.
     """
-    today = datetime.utcnow().date()
+    if day:
+        today = datetime.strptime(day, "%Y-%m-%d").date()
+    else:
+        today = datetime.utcnow().date()
     year = today.year
     # For games from Jan–Feb, use previous season
     if today.month in (1, 2):
@@ -65,52 +64,249 @@ def _season_and_type() -> (int, int):
     return year, 2
 
 
-def _collect_stats(obj: Any, out: Dict[str, Any]) -> None:
+# Every stat the metric spec reads. "category.name" pins a stat that
+# exists in several categories (sacks: passing = taken, defensive = made;
+# interceptions: passing = thrown, defensiveInterceptions = made). A tuple
+# holds names the spec chains as `a or b` for one value, so extraction can
+# stop once any of them is found.
+TEAM_STAT_KEYS = [
+    ("gamesPlayed", "teamGamesPlayed"),
+    ("passingYardsPerGame", "netPassingYardsPerGame", "netPassingYards"), "passingYards",
+    ("rushingYardsPerGame", "rushingYards"),
+    ("receivingYardsPerGame", "receivingYards"),
+    ("firstDownsPerGame", "firstDowns"),
+    "thirdDownConvPct", "fourthDownConvPct",
+    "kickoffReturnYards", "puntReturnYards",
+    "defensive.sacks",
+    ("defInterceptions", "interceptionsAgainst", "defensiveInterceptions.interceptions"),
+    ("totalTakeaways", "takeaways"), ("totalGiveaways", "giveaways"),
+    ("fumbleRecoveries", "fumblesRecovered"), "fumblesForced", "fumblesLost",
+    ("passYardsAllowedPerGame", "passingYardsAllowedPerGame", "yardsAllowed"),
+    ("rushYardsAllowedPerGame", "rushingYardsAllowedPerGame"),
+    "rushingAttempts", "passingAttempts", "completions", "completionPct",
+    ("quarterbackRating", "QBRating"),
+    ("totalPenalties", "penalties"),
+]
+TEAM_STATS = StatExtractor(TEAM_STAT_KEYS)
+
+
+def select_teams(teams: Iterable[str] | None = None) -> List[str]:
     """
-    Recursively walk ESPN JSON and pull any numeric {name, value} stats.
+    Team abbreviations to work on, in TEAM_IDS order.
+
+    None means the whole league; otherwise only the given teams (unknown
+    abbreviations are ignored).
     """
-    if isinstance(obj, dict):
-        name = obj.get("name")
-        val = obj.get("value")
-        if name and isinstance(val, (int, float)):
-            out[name] = val
-        for v in obj.values():
-            _collect_stats(v, out)
-    elif isinstance(obj, list):
-        for item in obj:
-            _collect_stats(item, out)
-
-
-def _fetch_team_stats(team_abbr: str) -> Dict[str, Any]:
+    if teams is None:
+        return list(TEAM_IDS.keys())
+    wanted = set(teams)
+    return [abbr for abbr in TEAM_IDS if abbr in wanted]
+
+
+def _fetch_team_stats(team_abbr: str, season: int | None = None,
+                      stale_before: float | None = None) -> Dict[str, Any]:
     """
     Call ESPN's team statistics endpoint for a single team and return a flat dict of stats.
     If anything fails, return {} so we never break the pipeline.
+
+    season defaults to the current one (see _season_and_type). A disk cache
+    copy stored before stale_before is revalidated rather than served.
+
+    The flattened result is memoised in the run cache, so team_stats and
+    derived share one request + parse per team.
     """
     team_id = TEAM_IDS.get(team_abbr)
     if not team_id:
         return {}
 
-    season, season_type = _season_and_type()
+    current, season_type = _season_and_type()
+    season = season or current
 
     url = (
         f"https://sports.core.api.espn.com/v2/sports/football/leagues/nfl/"
         f"seasons/{season}/types/{season_type}/teams/{team_id}/statistics"
     )
 
-    try:
-        resp = requests.get(url, headers=HEADERS, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-    except Exception as e:
-        print(f"[team_stats] failed to fetch stats for {team_abbr}: {e}")
-        return {}
+    def load() -> Dict[str, Any]:
+        data = resolve(url, resource="team_stats", label="team_stats", stale_before=stale_before)
+        if not data:
+            print(f"[team_stats] failed to fetch stats for {team_abbr}")
+            return {}
+
+        return TEAM_STATS.extract(data)
+
+    return RUN_CACHE.get(("team_stats", url), load)
+
+
+# ---------------------------------------------------------------------------
+# NFL 5..32 mapping spec
+#
+# One rule per output column. Terms:
+#   "key"      raw stat value
+#   "pg:key"   raw stat / games played
+#   "=name"    composite formula from _FORMULAS
+# Rule fields:
+#   keys      terms chained like `a or b or c` (first non-zero value wins)
+#   present   pick from `keys` by presence instead: first term with a value,
+#             zero included (for counts where 0 is a real answer)
+#   fallback  terms tried, same way, only where `keys` gave nothing
+#   per_game  divide the result by games played
+#   same_as   copy an earlier column
+#   const     fixed value for every team
+#   round     digits to round to
+# ---------------------------------------------------------------------------
+METRIC_SPEC: List[Dict[str, Any]] = [
+    # Team offensive passing yards per game
+    {"col": "NFL 5", "keys": ["passingYardsPerGame", "netPassingYardsPerGame", "pg:netPassingYards"],
+     "fallback": ["pg:passingYards"], "round": 2},
+    # Team offensive rushing yards per game
+    {"col": "NFL 6", "keys": ["rushingYardsPerGame", "pg:rushingYards"], "round": 2},
+    # Team receiving yards per game
+    {"col": "NFL 7", "keys": ["receivingYardsPerGame", "pg:receivingYards"], "round": 2},
+    # Team first downs per game
+    {"col": "NFL 8", "keys": ["firstDownsPerGame", "pg:firstDowns"], "round": 2},
+    # Team 3rd-down conversion percentage
+    {"col": "NFL 9", "keys": ["thirdDownConvPct"], "round": 2},
+    # Team kickoff return yards per game
+    {"col": "NFL 10", "keys": ["pg:kickoffReturnYards"], "round": 2},
+    # Team punt return yards per game
+    {"col": "NFL 11", "keys": ["pg:puntReturnYards"], "round": 2},
+    # Team sacks per game (defense)
+    {"col": "NFL 12", "keys": ["pg:defensive.sacks"], "round": 3},
+    # Defensive interceptions per game (proxy for top defender INTs)
+    {"col": "NFL 13",
+     "keys": ["defInterceptions", "interceptionsAgainst", "defensiveInterceptions.interceptions"],
+     "present": True, "fallback": ["=takeaways_less_fumble_recoveries"], "per_game": True,
+     "round": 3},
+    # Defensive forced fumbles per game
+    {"col": "NFL 14", "keys": ["pg:fumblesForced"], "round": 3},
+    # Team passing yards allowed per game
+    {"col": "NFL 15", "keys": ["passYardsAllowedPerGame", "passingYardsAllowedPerGame"],
+     "fallback": ["=pass_yards_allowed_pg"], "round": 2},
+    # Team rushing yards allowed per game
+    {"col": "NFL 16", "keys": ["rushYardsAllowedPerGame", "rushingYardsAllowedPerGame"], "round": 2},
+    # Team receiving yards allowed per game
+    {"col": "NFL 17", "same_as": "NFL 15"},
+    # Giveaway–takeaway differential per game
+    {"col": "NFL 18", "keys": ["=turnover_margin_pg"], "round": 3},
+    # Team defensive interceptions per game (full defense)
+    {"col": "NFL 19",
+     "keys": ["defInterceptions", "interceptionsAgainst", "defensiveInterceptions.interceptions"],
+     "present": True, "per_game": True, "round": 3},
+    # Team fumbles per game (offense giveaways via fumbles)
+    {"col": "NFL 20", "keys": ["pg:fumblesLost"], "round": 3},
+    # Team sacks per game (duplicate)
+    {"col": "NFL 21", "same_as": "NFL 12"},
+    # Quarter-based scoring: 0.0 unless the linescore store has the team's
+    # games (main.run layers linescores.get_quarter_scoring over these)
+    {"col": "NFL 22", "const": 0.0},
+    {"col": "NFL 23", "const": 0.0},
+    {"col": "NFL 24", "const": 0.0},
+    {"col": "NFL 25", "const": 0.0},
+    # Rushing attempts / passing attempts / completions per game
+    {"col": "NFL 26", "keys": ["pg:rushingAttempts"], "round": 3},
+    {"col": "NFL 27", "keys": ["pg:passingAttempts"], "round": 3},
+    {"col": "NFL 28", "keys": ["pg:completions"], "round": 3},
+    # QB rating
+    {"col": "NFL 29", "keys": ["quarterbackRating", "QBRating"], "round": 2},
+    # Completion percentage
+    {"col": "NFL 30", "keys": ["completionPct"], "round": 2},
+    # Penalties per game
+    {"col": "NFL 31", "keys": ["pg:totalPenalties", "pg:penalties"], "round": 3},
+    # 4th-down conversion percentage (offense)
+    {"col": "NFL 32", "keys": ["fourthDownConvPct"], "round": 2},
+]
+
+
+def _first_truthy(series: List[pd.Series]) -> pd.Series:
+    """Vectorised `a or b or c`: first non-missing, non-zero value, else the last."""
+    out = series[-1]
+    for s in reversed(series[:-1]):
+        out = s.where(s.notna() & (s != 0), out)
+    return out
+
 
-    out: Dict[str, Any] = {}
-    _collect_stats(data, out)
+def _first_present(series: List[pd.Series]) -> pd.Series:
+    """First non-missing value (zeros count), else NaN."""
+    out = series[-1]
+    for s in reversed(series[:-1]):
+        out = s.where(s.notna(), out)
     return out
 
 
-def get_team_metrics() -> Dict[str, Dict[str, float]]:
+_FORMULAS: Dict[str, Callable[[pd.DataFrame, pd.Series], pd.Series]] = {
+    "takeaways_less_fumble_recoveries": lambda f, gp: (
+        f["totalTakeaways"]
+        - _first_truthy([f["fumbleRecoveries"], f["fumblesRecovered"]]).fillna(0)
+    ),
+    "pass_yards_allowed_pg": lambda f, gp: (
+        f["yardsAllowed"] / gp - f["rushingYardsAllowedPerGame"]
+    ),
+    "turnover_margin_pg": lambda f, gp: (
+        _first_truthy([f["totalTakeaways"], f["takeaways"]])
+        - _first_truthy([f["totalGiveaways"], f["giveaways"]])
+    ) / gp,
+}
+
+
+def _compile_term(term: str):
+    if term.startswith("="):
+        return _FORMULAS[term[1:]]
+    if term.startswith("pg:"):
+        key = term[3:]
+        return lambda f, gp: f[key] / gp
+    return lambda f, gp: f[term]
+
+
+def _compile_rule(rule: Dict[str, Any]):
+    keys = [_compile_term(t) for t in rule.get("keys", [])]
+    fallback = [_compile_term(t) for t in rule.get("fallback", [])]
+
+    def evaluate(frame: pd.DataFrame, gp: pd.Series, done: pd.DataFrame) -> pd.Series:
+        if "const" in rule:
+            return pd.Series(float(rule["const"]), index=frame.index)
+        if "same_as" in rule:
+            return done[rule["same_as"]]
+        pick = _first_present if rule.get("present") else _first_truthy
+        v = pick([t(frame, gp) for t in keys])
+        if fallback:
+            v = v.fillna(_first_truthy([t(frame, gp) for t in fallback]))
+        if rule.get("per_game"):
+            v = v / gp
+        if "round" in rule:
+            v = v.round(rule["round"])
+        return v
+
+    return rule["col"], evaluate
+
+
+# Compiled once at import; map_metrics just runs these column by column.
+_COMPILED_SPEC = [_compile_rule(rule) for rule in METRIC_SPEC]
+_RAW_COLUMNS = TEAM_STATS.wanted
+
+
+def map_metrics(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Apply METRIC_SPEC to a (rows × raw stats) frame, one row per team (or
+    team-season), and return a (rows × "NFL n") frame. Missing values stay NaN.
+    """
+    frame = raw.reindex(columns=list(dict.fromkeys([*raw.columns, *_RAW_COLUMNS])))
+    frame = frame.apply(pd.to_numeric, errors="coerce")
+    gp = _first_truthy([frame["gamesPlayed"], frame["teamGamesPlayed"]])
+    gp = gp.where(gp.notna() & (gp != 0), 1.0)
+
+    out = pd.DataFrame(index=frame.index)
+    for col, evaluate in _COMPILED_SPEC:
+        out[col] = evaluate(frame, gp, out)
+    return out
+
+
+@timed("team_stats")
+def get_team_metrics(
+    teams: Iterable[str] | None = None,
+    season: int | None = None,
+    stale_before: float | None = None,
+) -> Dict[str, Dict[str, float]]:
     """
     Map ESPN team stats JSON into NFL 5..32 columns from John's 34-metric spec.
 
@@ -118,185 +314,25 @@ def get_team_metrics() -> Dict[str, Dict[str, float]]:
     `starters` module.
     NFL 33..34 (road/home PPG) are filled in main.py via derived.get_home_road_ppg().
 
-    This function focuses on team-level stats: NFL 5..32.
+    This function focuses on team-level stats: NFL 5..32, as declared in
+    METRIC_SPEC and evaluated for all teams at once by map_metrics().
+
+    `teams` limits the work to those abbreviations (e.g. today's slate);
+    None fetches all 32. `season` defaults to the current one. Team stats are
+    fetched concurrently through pool.map_teams; the result keeps TEAM_IDS
+    order. Disk cache copies stored before `stale_before` are revalidated.
     """
-    metrics: Dict[str, Dict[str, float]] = {}
-
-    for abbr in TEAM_IDS.keys():
-        raw = _fetch_team_stats(abbr)
-        if not raw:
-            continue
-
-        m: Dict[str, float] = {}
-        gp = float(
-            raw.get("gamesPlayed")
-            or raw.get("teamGamesPlayed")
-            or 1.0
-        )
-
-        def per_game(key: str) -> Optional[float]:
-            v = raw.get(key)
-            if v is None:
-                return None
-            try:
-                return float(v) / gp
-            except Exception:
-                return None
-
-        # ---- NFL 5: Team offensive passing yards per game ----
-        v = (
-            raw.get("passingYardsPerGame")
-            or raw.get("netPassingYardsPerGame")
-            or (per_game("netPassingYards") if "netPassingYards" in raw else None)
-        )
-        if v is None and "passingYards" in raw:
-            v = per_game("passingYards")
-        if v is not None:
-            m["NFL 5"] = round(float(v), 2)
-
-        # ---- NFL 6: Team offensive rushing yards per game ----
-        v = raw.get("rushingYardsPerGame") or per_game("rushingYards")
-        if v is not None:
-            m["NFL 6"] = round(float(v), 2)
-
-        # ---- NFL 7: Team receiving yards per game ----
-        v = raw.get("receivingYardsPerGame") or per_game("receivingYards")
-        if v is not None:
-            m["NFL 7"] = round(float(v), 2)
-
-        # ---- NFL 8: Team first downs per game ----
-        v = raw.get("firstDownsPerGame") or per_game("firstDowns")
-        if v is not None:
-            m["NFL 8"] = round(float(v), 2)
-
-        # ---- NFL 9: Team 3rd-down conversion percentage ----
-        v = raw.get("thirdDownConvPct")
-        if v is not None:
-            m["NFL 9"] = round(float(v), 2)
-
-        # ---- NFL 10: Team kickoff return yards per game ----
-        v = per_game("kickoffReturnYards")
-        if v is not None:
-            m["NFL 10"] = round(float(v), 2)
-
-        # ---- NFL 11: Team punt return yards per game ----
-        v = per_game("puntReturnYards")
-        if v is not None:
-            m["NFL 11"] = round(float(v), 2)
-
-        # ---- NFL 12: Team sacks per game (defense) ----
-        v = per_game("sacks")
-        if v is not None:
-            m["NFL 12"] = round(float(v), 3)
-
-        # ---- NFL 13: Defensive interceptions per game (proxy for top defender INTs) ----
-        v = raw.get("defInterceptions") or raw.get("interceptionsAgainst")
-        if v is None:
-            take = raw.get("totalTakeaways")
-            fum_rec = raw.get("fumbleRecoveries") or raw.get("fumblesRecovered")
-            if take is not None:
-                try:
-                    v = float(take) - float(fum_rec or 0)
-                except Exception:
-                    v = None
-        if v is not None:
-            m["NFL 13"] = round(float(v) / gp, 3)
-
-        # ---- NFL 14: Defensive forced fumbles per game ----
-        v = per_game("fumblesForced")
-        if v is not None:
-            m["NFL 14"] = round(float(v), 3)
-
-        # ---- NFL 15: Team passing yards allowed per game ----
-        v = (
-            raw.get("passYardsAllowedPerGame")
-            or raw.get("passingYardsAllowedPerGame")
-        )
-        if v is None and "yardsAllowed" in raw and "rushingYardsAllowedPerGame" in raw:
-            try:
-                v = float(raw["yardsAllowed"]) / gp - float(
-                    raw["rushingYardsAllowedPerGame"]
-                )
-            except Exception:
-                v = None
-        if v is not None:
-            m["NFL 15"] = round(float(v), 2)
-
-        # ---- NFL 16: Team rushing yards allowed per game ----
-        v = raw.get("rushYardsAllowedPerGame") or raw.get("rushingYardsAllowedPerGame")
-        if v is not None:
-            m["NFL 16"] = round(float(v), 2)
-
-        # ---- NFL 17: Team receiving yards allowed per game ----
-        v = m.get("NFL 15")
-        if v is not None:
-            m["NFL 17"] = v
-
-        # ---- NFL 18: Giveaway–takeaway differential per game ----
-        give = raw.get("totalGiveaways") or raw.get("giveaways")
-        take = raw.get("totalTakeaways") or raw.get("takeaways")
-        if give is not None and take is not None:
-            try:
-                m["NFL 18"] = round((float(take) - float(give)) / gp, 3)
-            except Exception:
-                pass
-
-        # ---- NFL 19: Team defensive interceptions per game (full defense) ----
-        v = raw.get("defInterceptions") or raw.get("interceptionsAgainst")
-        if v is not None:
-            m["NFL 19"] = round(float(v) / gp, 3)
-
-        # ---- NFL 20: Team fumbles per game (offense giveaways via fumbles) ----
-        v = per_game("fumblesLost")
-        if v is not None:
-            m["NFL 20"] = round(float(v), 3)
-
-        # ---- NFL 21: Team sacks per game (duplicate) ----
-        if "NFL 12" in m:
-            m["NFL 21"] = m["NFL 12"]
-
-        # ---- NFL 22–25: quarter-based scoring placeholders (numeric, non-blank) ----
-        m.setdefault("NFL 22", 0.0)
-        m.setdefault("NFL 23", 0.0)
-        m.setdefault("NFL 24", 0.0)
-        m.setdefault("NFL 25", 0.0)
-
-        # ---- NFL 26: Rushing attempts per game ----
-        v = per_game("rushingAttempts")
-        if v is not None:
-            m["NFL 26"] = round(float(v), 3)
-
-        # ---- NFL 27: Passing attempts per game ----
-        v = per_game("passingAttempts")
-        if v is not None:
-            m["NFL 27"] = round(float(v), 3)
-
-        # ---- NFL 28: Completions per game ----
-        v = per_game("completions")
-        if v is not None:
-            m["NFL 28"] = round(float(v), 3)
-
-        # ---- NFL 29: QB rating ----
-        v = raw.get("quarterbackRating") or raw.get("QBRating")
-        if v is not None:
-            m["NFL 29"] = round(float(v), 2)
-
-        # ---- NFL 30: Completion percentage ----
-        v = raw.get("completionPct")
-        if v is not None:
-            m["NFL 30"] = round(float(v), 2)
-
-        # ---- NFL 31: Penalties per game ----
-        v = per_game("totalPenalties") or per_game("penalties")
-        if v is not None:
-            m["NFL 31"] = round(float(v), 3)
-
-        # ---- NFL 32: 4th-down conversion percentage (offense) ----
-        v = raw.get("fourthDownConvPct")
-        if v is not None:
-            m["NFL 32"] = round(float(v), 2)
-
-        if m:
-            metrics[abbr] = m
-
-    return metrics
+    raws = map_teams(
+        lambda abbr: _fetch_team_stats(abbr, season, stale_before),
+        select_teams(teams),
+        label="team_stats",
+    )
+    raws = {abbr: raw for abbr, raw in raws.items() if raw}
+    if not raws:
+        return {}
+
+    mapped = map_metrics(pd.DataFrame.from_dict(raws, orient="index"))
+    return {
+        abbr: {col: float(v) for col, v in row.items() if pd.notna(v)}
+        for abbr, row in mapped.to_dict(orient="index").items()
+    }
@@ -0,0 +1,78 @@
+# src/test_starters.py
+
+"""Athlete stats vs. the disk cache: a copy cached before the final is never current."""
+
+import json
+import time
+
+import requests
+
+from . import http, starters
+from .cache import DISK_CACHE, RUN_CACHE
+
+ATHLETE = f"{starters.BASE}/athletes/1"
+STATS_URL = f"{ATHLETE}/statistics/2025/type/2"
+
+
+def _doc(passing_yards: float) -> dict:
+    return {"splits": {"categories": [
+        {"name": "passing", "stats": [{"name": "passingYards", "value": passing_yards}]},
+    ]}}
+
+
+def _cache_doc(doc: dict, stored_at: float) -> None:
+    DISK_CACHE.store(STATS_URL, "athlete", json.dumps(doc).encode("utf-8"))
+    meta_path, _ = DISK_CACHE._paths(STATS_URL)
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta["stored_at"] = stored_at
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+
+def _serve(monkeypatch, doc: dict) -> list:
+    calls = []
+
+    def fake_get(url, **kwargs):
+        calls.append(url)
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp._content = json.dumps(doc).encode("utf-8")
+        return resp
+
+    monkeypatch.setattr(http, "_get", fake_get)
+    return calls
+
+
+def _setup(tmp_path):
+    DISK_CACHE.configure(str(tmp_path / "cache"))
+    RUN_CACHE.clear()
+    starters.ATHLETE_STATS.open(None)
+
+
+def test_cached_copy_from_before_final_is_refetched(tmp_path, monkeypatch):
+    _setup(tmp_path)
+    final = time.time() - 600
+    _cache_doc(_doc(200.0), stored_at=final - 3600)   # fresh by TTL, but pre-final
+    calls = _serve(monkeypatch, _doc(450.0))
+    try:
+        stats = starters._get_player_stats(ATHLETE, 2025, 2, changed_at=final)
+        assert stats == {"passingYards": 450.0}
+        assert calls == [STATS_URL]
+        assert starters.ATHLETE_STATS.get(STATS_URL)["fetched_at"] >= final
+    finally:
+        DISK_CACHE.configure(None)
+
+
+def test_cached_copy_from_after_final_keeps_its_stored_at(tmp_path, monkeypatch):
+    _setup(tmp_path)
+    final = time.time() - 3600
+    stored_at = final + 600
+    _cache_doc(_doc(200.0), stored_at=stored_at)
+    calls = _serve(monkeypatch, _doc(450.0))
+    try:
+        stats = starters._get_player_stats(ATHLETE, 2025, 2, changed_at=final)
+        assert stats == {"passingYards": 200.0}
+        assert calls == []
+        assert starters.ATHLETE_STATS.get(STATS_URL)["fetched_at"] == stored_at
+    finally:
+        DISK_CACHE.configure(None)
@@ -0,0 +1,33 @@
+# src/test_team_stats.py
+
+"""METRIC_SPEC interception columns: a real zero is kept, not skipped."""
+
+import math
+
+import pandas as pd
+
+from .team_stats import map_metrics
+
+
+def _metrics(**raw) -> dict:
+    frame = pd.DataFrame([{"gamesPlayed": 8, **raw}], index=["DAL"])
+    return map_metrics(frame).loc["DAL"].to_dict()
+
+
+def test_zero_interceptions_stay_zero():
+    for key in ("defInterceptions", "interceptionsAgainst", "defensiveInterceptions.interceptions"):
+        row = _metrics(**{key: 0, "totalTakeaways": 9, "fumbleRecoveries": 3})
+        assert row["NFL 13"] == 0.0, key
+        assert row["NFL 19"] == 0.0, key
+
+
+def test_first_present_interception_key_wins():
+    row = _metrics(**{"defInterceptions": 0, "defensiveInterceptions.interceptions": 4})
+    assert row["NFL 13"] == 0.0
+    assert row["NFL 19"] == 0.0
+
+
+def test_missing_interceptions_fall_back_to_takeaways():
+    row = _metrics(totalTakeaways=9, fumbleRecoveries=3)
+    assert row["NFL 13"] == 0.75
+    assert math.isnan(row["NFL 19"])
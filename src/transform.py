@@ -1,9 +1,9 @@
 # src/transform.py
-from datetime import datetime
 from .sources.pfr import team_game_log_year
+from .team_stats import _season_and_type
 
 def compute_derived(team, raw):
-    season = datetime.now().year
+    season, _ = _season_and_type()
     try:
         _, agg = team_game_log_year(team, season)
     except Exception as e:
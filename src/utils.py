@@ -1,9 +1,14 @@
 ﻿import os
 import csv
+import threading
 import yaml
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
+import pandas as pd
+
 try:
     from zoneinfo import ZoneInfo
 except ImportError:  # Python <3.9 fallback (probably not needed here)
@@ -14,12 +19,23 @@ BASE_DIR = Path(__file__).resolve().parents[1]
 CONFIG_DIR = BASE_DIR / "config"
 
 
+# Optional YAML file whose top-level keys override config/settings.yaml
+# (used by the offline benchmark to point runs at its own dirs and server).
+SETTINGS_OVERRIDE_ENV = "NFL_PILOT_SETTINGS"
+
+
 def load_settings() -> dict:
     """
     Load config/settings.yaml into a dict.
     """
     with open(CONFIG_DIR / "settings.yaml", "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        settings = yaml.safe_load(f)
+
+    override = os.environ.get(SETTINGS_OVERRIDE_ENV)
+    if override:
+        with open(override, "r", encoding="utf-8") as f:
+            settings.update(yaml.safe_load(f) or {})
+    return settings
 
 
 def ensure_dirs(*paths: str) -> None:
@@ -30,6 +46,30 @@ def ensure_dirs(*paths: str) -> None:
         Path(p).mkdir(parents=True, exist_ok=True)
 
 
+@contextmanager
+def atomic_path(path):
+    """
+    Yield a temp path next to `path` to write into; on success it is renamed
+    over `path`, so readers never see a half-written file. On error the temp
+    file is removed and `path` is left as it was. Parent dirs are created.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def atomic_write(path, data: bytes) -> None:
+    """Write data to path via a temp file + rename (see atomic_path)."""
+    with atomic_path(path) as tmp:
+        tmp.write_bytes(data)
+
+
 def today_et(tz_name: str = "America/New_York"):
     """
     Return today's date in the given timezone (default ET).
@@ -42,9 +82,16 @@ def read_schema():
     """
     Read config/fields_schema.csv and return a list of field names.
 
+    Parsed once per process; callers get their own copy of the list.
+
     Handles UTF-8 BOM and ignores blank / commented rows.
     Expected columns: name,description
     """
+    return list(_read_schema())
+
+
+@lru_cache(maxsize=None)
+def _read_schema() -> tuple:
     path = CONFIG_DIR / "fields_schema.csv"
     fields = []
 
@@ -66,4 +113,12 @@ def read_schema():
                 continue
             fields.append(name)
 
-    return fields
+    return tuple(fields)
+
+
+@lru_cache(maxsize=None)
+def schema_columns() -> pd.Index:
+    """
+    The output schema compiled once into a column index (see read_schema).
+    """
+    return pd.Index(_read_schema())